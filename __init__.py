@@ -6,8 +6,8 @@ Includes both programmatic access and a GUI manager.
 """
 
 from .archive_handler import CrudeArchiveHandler
-from .common import ArchiveCommon
+from .common import ArchiveCommon, FileEntry
 from .manager import CrudeArchiveManager, run_gui
 
-__all__ = ['CrudeArchiveHandler', 'ArchiveCommon', 'CrudeArchiveManager', 'run_gui']
+__all__ = ['CrudeArchiveHandler', 'ArchiveCommon', 'FileEntry', 'CrudeArchiveManager', 'run_gui']
 __version__ = '1.0.0'
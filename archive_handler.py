@@ -1,79 +1,570 @@
 import os
-from typing import Dict, Any, Optional, Union, List, Tuple
+import mmap
+import itertools
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from typing import Dict, Any, Optional, Union, List, Tuple, Iterator, Iterable, BinaryIO
 import base64
+import io
 import json
+import math
+import re
 import struct
 import zlib
-try:
-    from common import ArchiveCommon
-except ImportError:
-    from .common import ArchiveCommon
+
+# Imported as part of the crudearch package, or as a flat module
+if __package__:
+    from .common import ArchiveCommon, FileEntry, ZSTD_AVAILABLE
+else:
+    from common import ArchiveCommon, FileEntry, ZSTD_AVAILABLE
 
 try:
     import numpy as np
+    from numpy.lib import format as npy_format
     NUMPY_AVAILABLE = True
 except ImportError:
     NUMPY_AVAILABLE = False
 
-try:
-    from crudearch.common import ArchiveCommon
-except ImportError:
-    try:
-        from common import ArchiveCommon
-    except ImportError:
-        try:
-            from .common import ArchiveCommon
-        except ImportError as e:
-            raise ImportError(
-                "Failed to import ArchiveCommon. "
-                "Tried:\n"
-                "1. crudearch.archive_handler\n"
-                "2. archive_handler\n"
-                "3. .archive_handler\n"
-                f"Original error: {str(e)}\n"
-            )
+if ZSTD_AVAILABLE:
+    import zstandard as zstd
+
+# Archive headers, both versions share one length
+_MAGIC = ArchiveCommon.MAGIC_HEADER
+_LEGACY_MAGIC = ArchiveCommon.LEGACY_MAGIC_HEADER
+_MAGIC_LEN = len(_MAGIC)
+
 # In ArchiveCommon class
 RESTRICTED_TYPES = {'exe', 'dll', 'bat', 'sh', 'php'}
 
+# File reads release the GIL, so imports overlap them on a thread pool
+_IMPORT_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+_PARALLEL_IMPORT_MIN = 8  # Smaller directories are read inline
+
+# Opening relative to an already open directory skips re-resolving the full path
+_DIR_FD_SUPPORTED = os.open in os.supports_dir_fd and os.scandir in os.supports_fd
+
+def _infer_type(name: str, default: str = 'bin') -> str:
+    """File type from the name's extension, or default when it has none"""
+    _, dot, ext = name.rpartition('.')
+    return ext if dot else default
+
+def _walk_files(dir_path: str) -> Iterator[Tuple[Optional[int], List[str]]]:
+    """
+    Walk a directory tree yielding (dir_fd, names) for the files of each directory
+    Names are relative to dir_fd, or full paths with dir_fd None on platforms
+    without fd-relative opens. The directory fd stays open until the caller
+    resumes the generator.
+    """
+    if not _DIR_FD_SUPPORTED:
+        for root, _, files in os.walk(dir_path):
+            yield None, [os.path.join(root, file) for file in files]
+        return
+    yield from _walk_dir_fd(os.open(dir_path, os.O_RDONLY | os.O_DIRECTORY))
+
+def _walk_dir_fd(dir_fd: int) -> Iterator[Tuple[int, List[str]]]:
+    """Recursive worker for _walk_files, takes ownership of dir_fd"""
+    try:
+        files, subdirs = [], []
+        with os.scandir(dir_fd) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.name)
+                elif entry.is_file():
+                    files.append(entry.name)
+        yield dir_fd, files
+        
+        for name in subdirs:
+            try:
+                sub_fd = os.open(name, os.O_RDONLY | os.O_DIRECTORY, dir_fd=dir_fd)
+            except OSError:
+                continue  # Unreadable directories are skipped like os.walk does
+            yield from _walk_dir_fd(sub_fd)
+    finally:
+        os.close(dir_fd)
+
+# Fixed media header layouts, decoded in one call each
+_WAV_FMT = struct.Struct('<HHIIHH')        # fmt chunk fields at offset 20
+_WAV_DATA_LEN = struct.Struct('<I')        # data chunk size at offset 40
+_AVI_HEADER = struct.Struct('<I12xII8xII') # frames, width, height, rate, scale at 48
+
+# Material references in OBJ sources
+_OBJ_USEMTL = re.compile(rb'^usemtl[ \t]+(\S+)', re.MULTILINE)
+_OBJ_VERTEX = re.compile(rb'^v[ \t]+(\S+)[ \t]+(\S+)[ \t]+(\S+)', re.MULTILINE)
+
+# FBX animation stack, up to its first closing brace
+_FBX_ANIM_BLOCK = re.compile(rb'AnimationStack[^}]*\}')
+
+# MPEG audio frame sync (11 set bits) followed by the rest of the 4 byte header
+_MPEG_SYNC = re.compile(rb'\xff[\xe0-\xff]..', re.DOTALL)
+
+# ID3v2 frame header (id, size, flags) and FLAC metadata block header
+_ID3_FRAME = struct.Struct('>4sI2x')
+_FLAC_BLOCK = struct.Struct('>I')          # last flag, 7 bit type, 24 bit size
+_U32BE = struct.Struct('>I')
+_U16BE = struct.Struct('>H')
+
+# Fixed position header fields, read in place without slicing
+_GIF_SIZE = struct.Struct('<6xHH')          # logical screen width, height
+_PNG_SIZE = struct.Struct('>16xII')         # IHDR width, height
+_OGG_RATES = struct.Struct('<12x4I')        # sample rate, max, nominal, min bitrate
+_WAV_TIMING = struct.Struct('<22xHI6xH4xI') # channels, sample rate, bits per sample, data size
+_AVI_TIMING = struct.Struct('<32xI12xI')    # microseconds per frame, total frames
+
+# MP4 atom header (size, type), 64-bit size when size == 1, and the
+# 32-bit duration fields of version 0 and version 1 mvhd boxes
+_ATOM_HDR = struct.Struct('>I4s')
+_ATOM_LARGE_SIZE = struct.Struct('>Q')
+_MVHD_V0 = struct.Struct('>12xII')         # timescale, duration after version/flags
+_MVHD_V1 = struct.Struct('>20xIQ')
+
+def _iter_atoms(data: bytes, start: int = 0, end: Optional[int] = None
+                ) -> Iterator[Tuple[bytes, int, int]]:
+    """Yield (type, body_start, atom_end) for the MP4 atoms in data[start:end]"""
+    end = len(data) if end is None else min(end, len(data))
+    pos = start
+    while pos + _ATOM_HDR.size <= end:
+        size, atom_type = _ATOM_HDR.unpack_from(data, pos)
+        body = pos + _ATOM_HDR.size
+        if size == 1 and body + 8 <= end:
+            size, = _ATOM_LARGE_SIZE.unpack_from(data, body)
+            body += 8
+        elif size == 0:
+            size = end - pos  # Atom runs to the end of its container
+        if size < body - pos:
+            break  # Corrupt size, stop instead of looping forever
+        yield atom_type, body, min(pos + size, end)
+        pos += size
+
+# Atoms that only hold other atoms, on the path from moov to the sample tables
+_MP4_CONTAINERS = {b'moov', b'trak', b'mdia', b'minf', b'stbl'}
+
+def _walk_atoms(data: bytes, start: int = 0, end: Optional[int] = None
+                ) -> Iterator[Tuple[bytes, int, int]]:
+    """Like _iter_atoms, but also descends into the container atoms"""
+    for atom_type, body, atom_end in _iter_atoms(data, start, end):
+        yield atom_type, body, atom_end
+        if atom_type in _MP4_CONTAINERS:
+            yield from _walk_atoms(data, body, atom_end)
+
+def _find_codec_config(data: bytes, config_type: bytes) -> Optional[Tuple[int, int]]:
+    """
+    Locate a codec configuration atom (avcC, hvcC) in an MP4 file
+    The FourCC is rare enough to search for directly, instead of walking
+    down to the stsd sample entries. A match only counts when the preceding
+    size field fits the data. data may be a memoryview, which has no find(),
+    so the search goes through re. Returns (body_start, atom_end) or None.
+    """
+    for match in re.compile(re.escape(config_type)).finditer(data, 4):
+        start = match.start() - 4
+        size, = _U32BE.unpack_from(data, start)
+        if _ATOM_HDR.size <= size <= len(data) - start:
+            return match.end(), start + size
+    return None
+
+# Sample table entries (stsz/stco are 32-bit, co64 is 64-bit), big endian
+_STSZ_HEADER = struct.Struct('>4xII')       # uniform size, count after version/flags
+_TABLE_COUNT = struct.Struct('>4xI')
+_U32BE_ITEM = struct.Struct('>I')
+_U64BE_ITEM = struct.Struct('>Q')
+
+def _read_table(data: bytes, start: int, end: int, count: int,
+                item: struct.Struct) -> Union['np.ndarray', Tuple[int, ...]]:
+    """
+    Decode count big-endian unsigned integers from data[start:end]
+    Returns a native-endian NumPy array when NumPy is installed, so offsets can
+    be looked up with searchsorted, otherwise a tuple. Entries beyond end are
+    dropped.
+    """
+    count = max(0, min(count, (end - start) // item.size))
+    table = memoryview(data)[start:start + count * item.size]
+    if NUMPY_AVAILABLE:
+        dtype = '>u4' if item.size == 4 else '>u8'
+        return np.frombuffer(table, dtype=dtype).astype(dtype.replace('>', '='))
+    return tuple(value for value, in item.iter_unpack(table))
+
+# MP3 bitrates in kbit/s, one row per (version group * 3 + layer row)
+_MP3_BITRATES = (
+    # MPEG 1
+    (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),  # Layer I
+    (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),     # Layer II
+    (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),      # Layer III
+    # MPEG 2/2.5
+    (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),     # Layer I
+    (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),          # Layer II
+    (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),          # Layer III
+)
+
+# MP3 sample rates, three per version, indexed by the header's version bits
+_MP3_SAMPLE_RATES = (
+    11025, 12000, 8000,    # 0: MPEG 2.5
+    0, 0, 0,               # 1: reserved
+    22050, 24000, 16000,   # 2: MPEG 2
+    44100, 48000, 32000,   # 3: MPEG 1
+)
+
+# Magic number checks of validate_media_file, types without one always pass
+_MEDIA_SIGNATURES = {
+    'png': lambda d: d.startswith(b'\x89PNG'),
+    'jpg': lambda d: d.startswith(b'\xFF\xD8'),
+    'gif': lambda d: d.startswith(b'GIF'),
+    'bmp': lambda d: d.startswith(b'BM'),
+    'mp3': lambda d: d.startswith(b'ID3') or _MPEG_SYNC.match(d) is not None,
+    'wav': lambda d: d.startswith(b'RIFF') and d[8:12] == b'WAVE',
+    'mp4': lambda d: d[4:8] == b'ftyp',
+}
+
+# SFNT (TTF/OTF) table directory record: tag, checksum, offset, length
+_SFNT_TABLE = struct.Struct('>4sIII')
+_SFNT_DIR_START = 12
+
+# Display aspect ratios matched within 0.05, most common first
+_ASPECT_RATIOS = ((16 / 9, '16:9'), (4 / 3, '4:3'), (1.0, '1:1'))
+
+# Frame sizes common enough to answer before any arithmetic
+_COMMON_DIMENSIONS = {
+    (3840, 2160): '16:9', (2560, 1440): '16:9', (1920, 1080): '16:9',
+    (1280, 720): '16:9', (854, 480): '16:9',
+    (1024, 768): '4:3', (800, 600): '4:3', (640, 480): '4:3',
+}
+
+# LOD payloads are fed through zlib in slices of this size
+_LOD_CHUNK_SIZE = 64 * 1024
+_LOD_CACHE_SIZE = 32  # Decompressed LODs kept by get_model_lod
+
+# LODs are zstd frames when zstandard is installed, zlib streams otherwise.
+# Both are self-describing, so no codec tag is stored.
+_ZSTD_FRAME_MAGIC = b'\x28\xb5\x2f\xfd'
+_ZSTD_FRAME_HEADER_MAX = 18  # Magic plus the largest frame header
+
+def _compress_lod(data: bytes, out: bytearray, cctx: Any = None) -> Tuple[int, int]:
+    """
+    Compress a LOD payload onto the end of out
+    Returns the (offset, length) of the compressed data in out. cctx is a
+    zstd compressor to reuse across the levels of one model.
+    """
+    offset = len(out)
+    if ZSTD_AVAILABLE:
+        if cctx is None:
+            cctx = zstd.ZstdCompressor(level=ArchiveCommon.ZSTD_LEVEL)
+        out += cctx.compress(data)
+        return offset, len(out) - offset
+    # Deflated in fixed-size chunks
+    co = zlib.compressobj(6)
+    with memoryview(data) as view:
+        for i in range(0, len(view), _LOD_CHUNK_SIZE):
+            out += co.compress(view[i:i + _LOD_CHUNK_SIZE])
+    out += co.flush()
+    return offset, len(out) - offset
+
+def _decompress_lod(blob: bytes) -> Union[bytes, bytearray]:
+    """Decompress a payload produced by _compress_lod"""
+    if blob[:4] == _ZSTD_FRAME_MAGIC:
+        if not ZSTD_AVAILABLE:
+            raise ImportError("zstandard is required to read this archive's LODs")
+        return zstd.ZstdDecompressor().decompress(blob)
+    do = zlib.decompressobj()
+    out = bytearray()
+    with memoryview(blob) as view:
+        for i in range(0, len(view), _LOD_CHUNK_SIZE):
+            out += do.decompress(view[i:i + _LOD_CHUNK_SIZE])
+    out += do.flush()
+    return out
+
+def _b64_decoded_len(encoded: str) -> int:
+    """Size of the bytes a padded base64 string decodes to"""
+    return len(encoded) // 4 * 3 - encoded[-2:].count('=')
+
+def _model_id(name: str) -> str:
+    """Key a model's 3D metadata is stored under in the archive file"""
+    return name.replace('.', '_')
+
+class _LazyContent:
+    """File payload from a legacy archive, kept base64 encoded until first accessed"""
+    __slots__ = ('raw',)
+    
+    def __init__(self, raw: str):
+        self.raw = raw
+    
+    def __len__(self) -> int:
+        return _b64_decoded_len(self.raw)
+    
+    def resolve(self) -> bytes:
+        return ArchiveCommon.decode_content(self.raw)
+
+class _MappedContent:
+    """File payload backed by a slice of the mapped archive file"""
+    __slots__ = ('mm', 'offset', 'length')
+    
+    def __init__(self, mm: mmap.mmap, offset: int, length: int):
+        self.mm = mm
+        self.offset = offset
+        self.length = length
+    
+    def __len__(self) -> int:
+        return self.length
+    
+    def resolve(self) -> bytes:
+        return self.mm[self.offset:self.offset + self.length]
+    
+    def view(self) -> memoryview:
+        return memoryview(self.mm)[self.offset:self.offset + self.length]
+
+class _SourceContent:
+    """File payload left in its source file until accessed or saved"""
+    __slots__ = ('path', 'length')
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.length = os.stat(path).st_size
+    
+    def __len__(self) -> int:
+        return self.length
+    
+    def resolve(self) -> bytes:
+        return b''.join(self.chunks())
+    
+    def chunks(self) -> Iterator[bytes]:
+        """Yield exactly length bytes, the TOC was sized from them"""
+        with open(self.path, 'rb', buffering=0) as f:
+            remaining = self.length
+            while remaining:
+                chunk = f.read(min(remaining, ArchiveCommon.IO_CHUNK_SIZE))
+                if not chunk:
+                    raise ValueError(f"{self.path} shrank after it was added to the archive")
+                remaining -= len(chunk)
+                yield chunk
+
+class _TextBuffer(bytearray):
+    """UTF-8 text content owned by the archive, edited in place by the text methods"""
+    __slots__ = ()
+
+class _ViewReader(io.RawIOBase):
+    """Binary file object reading a memoryview in place, released on close"""
+    
+    def __init__(self, view: memoryview):
+        super().__init__()
+        self._view = view
+        self._pos = 0
+    
+    def readable(self) -> bool:
+        return True
+    
+    def readinto(self, b) -> int:
+        n = min(len(b), len(self._view) - self._pos)
+        b[:n] = self._view[self._pos:self._pos + n]
+        self._pos += n
+        return n
+    
+    def close(self) -> None:
+        if not self.closed:
+            self._view.release()
+        super().close()
+
+def _read_file(file_path: str, dir_fd: Optional[int] = None) -> bytearray:
+    """
+    Read a whole file into a buffer presized from its stat size
+    Uses unbuffered block reads so data lands directly in the final buffer
+    """
+    fd = os.open(file_path, os.O_RDONLY | getattr(os, 'O_BINARY', 0), dir_fd=dir_fd)
+    with open(fd, 'rb', buffering=0) as f:
+        size = os.fstat(f.fileno()).st_size
+        buf = bytearray(size)
+        offset = 0
+        with memoryview(buf) as view:
+            while offset < size:
+                n = f.readinto(view[offset:offset + ArchiveCommon.READ_CHUNK_SIZE])
+                if not n:
+                    break
+                offset += n
+    if offset < size:
+        del buf[offset:]  # File shrank while reading
+    return buf
+
+# Python 3.8+ on Linux, where save copies unchanged payloads in the kernel
+_COPY_FILE_RANGE = getattr(os, 'copy_file_range', None)
+
+def _copy_range(src: BinaryIO, dst: BinaryIO, offset: int, length: int) -> int:
+    """
+    Copy length bytes at offset in src to the current position of dst
+    dst must be flushed first. Returns the count copied, short of length
+    when the file systems involved do not support the copy.
+    """
+    done = 0
+    try:
+        while done < length:
+            n = _COPY_FILE_RANGE(src.fileno(), dst.fileno(), length - done, offset + done)
+            if not n:
+                break
+            done += n
+    except OSError:
+        pass  # EXDEV on older kernels, ENOSYS or EINVAL, the rest is written from the mapping
+    return done
+
+# .npy magic, then the version's header length field (u16 for 1.0, u32 for 2.0)
+_NPY_MAGIC = b'\x93NUMPY'
+_NPY_HEADER_LEN = {1: struct.Struct('<H'), 2: struct.Struct('<I')}
+
+def _load_npy(view: memoryview) -> 'np.ndarray':
+    """
+    np.load for a .npy payload, copying the array data out of view once
+    Only the header is parsed by numpy, the data is not staged through a
+    file object. Formats the fast path does not cover go to np.load.
+    """
+    prefix = _NPY_HEADER_LEN.get(view[6]) if view[:6] == _NPY_MAGIC else None
+    if prefix is None:
+        return np.load(io.BytesIO(view))
+    start = 8 + prefix.size + prefix.unpack_from(view, 8)[0]
+    header = io.BytesIO(view[:start])
+    if npy_format.read_magic(header) == (1, 0):
+        shape, fortran_order, dtype = npy_format.read_array_header_1_0(header)
+    else:
+        shape, fortran_order, dtype = npy_format.read_array_header_2_0(header)
+    if dtype.hasobject:
+        return np.load(io.BytesIO(view))  # Refuses pickled data like before
+    
+    count = 1
+    for n in shape:
+        count *= n
+    array = np.frombuffer(view, dtype=dtype, count=count, offset=start)
+    # The copy owns its data, so the view can be released afterwards
+    return array.reshape(shape, order='F' if fortran_order else 'C').copy(order='K')
+
+# Line breaks str.splitlines() honours in ASCII text besides \n
+_OTHER_LINE_BREAKS = (b'\r', b'\x0b', b'\x0c', b'\x1c', b'\x1d', b'\x1e')
+
+def _remove_fixed_width_column(data: bytes, col_start: int, col_end: int) -> Optional[bytes]:
+    """
+    remove_text_column for ASCII text whose lines all share one width
+    Cuts the column from every row at once on a NumPy grid. Returns None
+    when the text does not qualify, so the caller falls back to per line.
+    """
+    if not NUMPY_AVAILABLE or not 0 <= col_start <= col_end or not data.isascii():
+        return None
+    if any(br in data for br in _OTHER_LINE_BREAKS):
+        return None
+    if data.endswith(b'\n'):
+        data = data[:-1]  # splitlines() does not yield a final empty line
+    rows = data.count(b'\n') + 1
+    if rows < 2 or (len(data) + 1) % rows:
+        return None
+    stride = (len(data) + 1) // rows
+    width = stride - 1
+    if width <= col_start:
+        return None
+    
+    grid = np.frombuffer(data + b'\n', dtype=np.uint8).reshape(rows, stride)
+    if not (grid[:, width] == ord('\n')).all() or (grid[:, :width] == ord('\n')).any():
+        return None  # Same total size, but ragged lines
+    parts = [grid[:, :col_start]]
+    if col_end > col_start:
+        parts.append(np.full((rows, 1), ord(' '), dtype=np.uint8))
+    parts.append(grid[:, min(col_end, width):])  # The slice keeps the newlines
+    return np.hstack(parts).tobytes()[:-1]
+
 class CrudeArchiveHandler:
     """Core handler for CRUD Archive operations"""
+    __slots__ = ('filename', 'files', '_3d_metadata', '_lod_blob', '_lod_encoded',
+                 '_lod_cache', '_lower_names', '_mm', '_mm_file')
     
     def __init__(self, filename: str = None):
         self.filename = filename
-        self.files: Dict[str, Dict[str, Any]] = {}
+        self.files: Dict[str, FileEntry] = {}
         self._3d_metadata = {}
+        # Compressed LODs of every model, see _generate_lods. None until first
+        # used after a load, only the encoded copy is held until then.
+        self._lod_blob: Optional[bytearray] = bytearray()
+        self._lod_encoded: Optional[str] = None  # _lod_blob as last loaded or saved
+        # Recently decompressed LODs by (offset, length) in _lod_blob, cleared
+        # whenever the blob is replaced
+        self._lod_cache: 'OrderedDict[Tuple[int, int], bytes]' = OrderedDict()
+        # Lowercase name to name, built on demand and dropped when files changes
+        self._lower_names: Optional[Dict[str, str]] = None
+        self._mm: Optional[mmap.mmap] = None
+        self._mm_file: Optional[BinaryIO] = None  # Kept open for _copy_range in save
+    
+    def __enter__(self) -> 'CrudeArchiveHandler':
+        return self
+    
+    def __exit__(self, *exc) -> None:
+        self.close()
+    
+    def close(self) -> None:
+        """
+        Release the mapped archive file and drop all entries
+        Unsaved changes are discarded. The handler can be reused with
+        create() or load().
+        """
+        self.files = {}
+        self._lower_names = None
+        self._3d_metadata = {}
+        self._lod_blob = bytearray()
+        self._lod_encoded = None
+        self._lod_cache.clear()
+        self._release_mapping()
         
     def create(self, filename: str) -> None:
         """Create a new empty archive"""
+        self._release_mapping()
         self.filename = filename
         self.files = {}
+        self._lower_names = None
+        self._3d_metadata = {}
+        self._lod_blob = bytearray()
+        self._lod_encoded = None
+        self._lod_cache.clear()
         
     def load(self):
         """Extended load with 3D metadata"""
-        with open(self.filename, 'rb') as f:
-            header = f.read(len(ArchiveCommon.MAGIC_HEADER))
-            if header != ArchiveCommon.MAGIC_HEADER:
-                raise ValueError("Invalid archive format")
-                
-            data = json.loads(f.read().decode('utf-8'))
-            
-        self.files = {
-            name: {
-                'type': file_info['type'],
-                'content': ArchiveCommon.decode_content(file_info['content'])
+        mm, mm_file, data = self._map_archive()
+        if data.get('legacy'):
+            mm.close()  # Payloads are copied out of version 2 archives
+            mm_file.close()
+            files = {
+                name: FileEntry(_LazyContent(file_info['content']), file_info['type'])
+                for name, file_info in data['files'].items()
+            }
+        else:
+            files = {
+                name: FileEntry(
+                    _MappedContent(mm, file_info['offset'], file_info['length']),
+                    file_info['type'], file_info['flags'], file_info.get('metadata'))
+                for name, file_info in data['files'].items()
             }
-            for name, file_info in data['files'].items()
-        }
         
-        self._3d_metadata = {
-            name: {
-                'lod': {int(k): ArchiveCommon.decode_content(v) 
-                       for k,v in meta['lod'].items()},
+        self._release_mapping()
+        if not data.get('legacy'):
+            self._mm = mm
+            self._mm_file = mm_file
+        self.files = files
+        self._lower_names = None
+        
+        # Stored keys are model ids, held in memory under the file name
+        names = {_model_id(name): name for name in files}
+        lod_encoded = data.get('lod_blob', '')
+        lod_blob = None
+        self._3d_metadata = {}
+        for model_id, meta in data.get('3d_metadata', {}).items():
+            lods = {}
+            for level, lod in meta['lod'].items():
+                if isinstance(lod, str):
+                    # Older archives store each LOD as its own base64 string
+                    if lod_blob is None:
+                        lod_blob = bytearray(ArchiveCommon.decode_content(lod_encoded))
+                    raw = ArchiveCommon.decode_content(lod)
+                    lods[int(level)] = (len(lod_blob), len(raw))
+                    lod_blob += raw
+                    lod_encoded = None
+                else:
+                    lods[int(level)] = tuple(lod)
+            self._3d_metadata[names.get(model_id, model_id)] = {
+                'lod': lods,
                 'animations': meta['animations'],
                 'materials': meta['materials']
             }
-            for name, meta in data.get('3d_metadata', {}).items()
-        }
+        self._lod_blob = lod_blob
+        self._lod_encoded = lod_encoded
+        self._lod_cache.clear()
     
     def ssssave(self) -> None:
         """Save the archive to disk"""
@@ -84,30 +575,169 @@ class CrudeArchiveHandler:
             f.write(ArchiveCommon.MAGIC_HEADER)
             f.write(ArchiveCommon.serialize_archive(self.files))
 
-    def save(self):
-        """Extended save with 3D metadata"""
-        data = {
-            'files': {
-                name: {
-                    'type': info['type'],
-                    'content': ArchiveCommon.encode_content(info['content'])
-                }
-                for name, info in self.files.items()
-            },
+    def save(self, compression: Optional[str] = None):
+        """
+        Extended save with 3D metadata
+        compression='zstd' also compresses eligible files added uncompressed.
+        """
+        for name in [name for name, info in self.files.items() if info.json_dirty]:
+            self.flush_json(name)
+        if compression is not None:
+            for info in self.files.values():
+                if not info.flags:
+                    self._compress_entry(info, compression)
+        
+        # Write every model's LODs as one compacted buffer, leaving out
+        # data of models that were replaced since it was built
+        lod_index = {}
+        end = 0
+        compact = True
+        for name, meta in self._3d_metadata.items():
+            lod_index[name] = {}
+            for level, (offset, length) in meta.get('lod', {}).items():
+                lod_index[name][level] = (end, length)
+                compact = compact and offset == end
+                end += length
+        
+        if self._lod_blob is None:
+            size = _b64_decoded_len(self._lod_encoded)
+        else:
+            size = len(self._lod_blob)
+        if compact and end == size:
+            # Already compact, and unchanged since the last load or save
+            # when the encoded copy is still set
+            lod_blob = self._lod_blob
+            lod_encoded = self._lod_encoded
+        else:
+            lod_blob = bytearray()
+            with memoryview(self._lods()) as lods_view:
+                for name, meta in self._3d_metadata.items():
+                    for offset, length in meta.get('lod', {}).values():
+                        lod_blob += lods_view[offset:offset + length]
+            lod_encoded = None
+        if lod_encoded is None:
+            lod_encoded = ArchiveCommon.encode_content(lod_blob)
+        
+        extra = {
             '3d_metadata': {
-                name: {
-                    'lod': {k: ArchiveCommon.encode_content(v) 
-                           for k,v in meta['lod'].items()},
+                _model_id(name): {
+                    'lod': lod_index[name],
                     'animations': meta['animations'],
-                    'materials': meta['materials']
+                    'materials': meta.get('materials', {})
                 }
                 for name, meta in self._3d_metadata.items()
-            }
+            },
+            'lod_blob': lod_encoded
         }
         
-        with open(self.filename, 'wb') as f:
-            f.write(ArchiveCommon.MAGIC_HEADER)
-            f.write(json.dumps(data).encode('utf-8'))
+        # Windows cannot replace a file that is still mapped
+        if self._mm is not None and os.name == 'nt':
+            self._detach_mapping()
+        
+        # Entries may be backed by the current file, so write a new one
+        # beside it and swap it in once complete
+        tmp_path = self.filename + '.tmp'
+        try:
+            with open(tmp_path, 'wb', buffering=ArchiveCommon.IO_CHUNK_SIZE) as f:
+                if hasattr(os, 'posix_fadvise'):
+                    os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+                f.write(_MAGIC)
+                for chunk in ArchiveCommon.serialize_toc_iter(self.files, extra):
+                    f.write(chunk)
+                for info in self.files.values():
+                    content = info.content
+                    if (_COPY_FILE_RANGE is not None and isinstance(content, _MappedContent)
+                            and content.mm is self._mm
+                            and content.length >= ArchiveCommon.IO_CHUNK_SIZE):
+                        # Unchanged and large, copied file to file by the kernel
+                        f.flush()
+                        done = _copy_range(self._mm_file, f, content.offset, content.length)
+                        if done == content.length:
+                            continue
+                        with content.view() as view:
+                            f.write(view[done:])
+                    else:
+                        for chunk in ArchiveCommon.payload_chunks(content):
+                            f.write(chunk)
+            os.replace(tmp_path, self.filename)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        
+        for name, meta in self._3d_metadata.items():
+            if 'lod' in meta:
+                meta['lod'] = lod_index[name]
+        self._lod_blob = lod_blob
+        self._lod_encoded = lod_encoded
+        self._lod_cache.clear()
+        
+        # Point every entry at the saved file so in-memory copies can be freed
+        mm, mm_file, data = self._map_archive()
+        for name, file_info in data['files'].items():
+            self.files[name].content = _MappedContent(
+                mm, file_info['offset'], file_info['length'])
+        self._release_mapping()
+        self._mm = mm
+        self._mm_file = mm_file
+    
+    def _map_archive(self) -> Tuple[mmap.mmap, BinaryIO, Dict[str, Any]]:
+        """
+        Map the archive file and parse its table of contents
+        The file is returned still open, the caller closes it with the
+        mapping. Payload offsets in the result are absolute positions in
+        the mapping. Version 2 archives are parsed whole and flagged with
+        'legacy'.
+        """
+        f = open(self.filename, 'rb')
+        try:
+            if os.fstat(f.fileno()).st_size < _MAGIC_LEN:
+                raise ValueError("Invalid archive format")
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except BaseException:
+            f.close()
+            raise
+        
+        try:
+            header = mm[:_MAGIC_LEN]
+            if header == _MAGIC:
+                with memoryview(mm) as view:
+                    data = ArchiveCommon.deserialize_archive(view[_MAGIC_LEN:])
+                for file_info in data['files'].values():
+                    file_info['offset'] += _MAGIC_LEN
+            elif header == _LEGACY_MAGIC:
+                # The JSON body is parsed front to back in one pass
+                if hasattr(mm, 'madvise'):
+                    mm.madvise(mmap.MADV_SEQUENTIAL)
+                with memoryview(mm) as view:
+                    data = ArchiveCommon.deserialize_legacy_archive(view[_MAGIC_LEN:])
+                data['legacy'] = True
+            else:
+                raise ValueError("Invalid archive format")
+        except BaseException:
+            mm.close()
+            f.close()
+            raise
+        return mm, f, data
+    
+    def _detach_mapping(self) -> None:
+        """Copy mapped entries into memory and release the archive mapping"""
+        for info in self.files.values():
+            if isinstance(info.content, _MappedContent):
+                info.content = info.content.resolve()
+        self._release_mapping()
+    
+    def _release_mapping(self) -> None:
+        """Close the archive mapping, entries must no longer refer to it"""
+        if self._mm is not None:
+            try:
+                self._mm.close()
+            except BufferError:
+                pass  # Views from get_file_view() keep the mapping alive until released
+            self._mm = None
+        if self._mm_file is not None:
+            self._mm_file.close()
+            self._mm_file = None
 
     @staticmethod
     def is_restricted_type(file_type: str) -> bool:
@@ -117,9 +747,7 @@ class CrudeArchiveHandler:
     # Then modify validate_file_type:
     @staticmethod
     def validate_file_type(file_type: str) -> bool:
-        file_type = file_type.lower().strip('.')
-        return (file_type in {ft.lower() for ft in ArchiveCommon.SUPPORTED_TYPES} 
-                and not ArchiveCommon.is_restricted_type(file_type))
+        return file_type.lower().strip('.') in ArchiveCommon._ALLOWED_TYPES
     
     def add_media_file(self, name: str, file_path: str) -> None:
         """Add media file with automatic type detection"""
@@ -127,8 +755,7 @@ class CrudeArchiveHandler:
             raise FileNotFoundError(f"File not found: {file_path}")
         
         ext = os.path.splitext(file_path)[1][1:].lower()
-        with open(file_path, 'rb') as f:
-            data = f.read()
+        data = _read_file(file_path)
         
         if ext in {'png', 'jpg', 'jpeg', 'gif', 'bmp', 'tga'}:
             self.add_image(name, data)
@@ -141,7 +768,7 @@ class CrudeArchiveHandler:
     
     def add_audio(self, name: str, audio_data: bytes) -> None:
         """Specialized audio file adder"""
-        ext = name.split('.')[-1].lower()
+        ext = _infer_type(name).lower()
         if not self.validate_media_file(audio_data, ext):
             raise ValueError(f"Invalid {ext.upper()} audio file")
         
@@ -150,7 +777,7 @@ class CrudeArchiveHandler:
 
     def add_video(self, name: str, video_data: bytes) -> None:
         """Specialized video file adder"""
-        ext = name.split('.')[-1].lower()
+        ext = _infer_type(name).lower()
         if not self.validate_media_file(video_data, ext):
             raise ValueError(f"Invalid {ext.upper()} video file")
         
@@ -160,26 +787,128 @@ class CrudeArchiveHandler:
 
     def get_file_mime_type(self, filename: str) -> str:
         """Get MIME type of archived file"""
-        if filename not in self.files:
+        entry = self.files.get(filename)
+        if entry is None:
             raise FileNotFoundError(f"File {filename} not in archive")
-        return ArchiveCommon.get_mime_type(self.files[filename]['type'])
+        return ArchiveCommon.get_mime_type(entry.type)
     
 
-    def add_file(self, name: str, content: Union[bytes, str], file_type: str = None) -> None:
-        """Add a file to the archive"""
+    def add_file(self, name: str, content: Union[bytes, str], file_type: str = None,
+                 compression: Optional[str] = None,
+                 metadata: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Add a file to the archive
+        With compression='zstd', text-like files of 512 bytes or more are
+        stored compressed when that saves at least 5%. metadata must be
+        JSON serializable and is saved alongside the entry.
+        """
+        if isinstance(content, str):
+            self.add_file_str(name, content, file_type,
+                              compression=compression, metadata=metadata)
+        else:
+            self.add_file_bytes(name, content, file_type, compression, metadata)
+    
+    def add_file_bytes(self, name: str, content: bytes, file_type: str = None,
+                       compression: Optional[str] = None,
+                       metadata: Optional[Dict[str, Any]] = None) -> None:
+        """Add binary content to the archive, see add_file()"""
         if file_type is None:
-            file_type = name.split('.')[-1] if '.' in name else 'bin'
+            file_type = _infer_type(name)
+        
+        self._store(name, content, file_type)
+        if compression is not None:
+            self._compress_entry(self.files[name], compression)
+        if metadata:
+            self.files[name].metadata = metadata
+    
+    def add_file_str(self, name: str, text: str, file_type: str = None,
+                     encoding: str = 'utf-8', compression: Optional[str] = None,
+                     metadata: Optional[Dict[str, Any]] = None) -> None:
+        """Add text to the archive encoded with the given encoding, see add_file()"""
+        self.add_file_bytes(name, text.encode(encoding), file_type, compression, metadata)
+    
+    def _store(self, name: str, content: bytes, file_type: str) -> None:
+        """Validate the type and insert already encoded content"""
+        if not ArchiveCommon.validate_file_type(file_type):
+            raise ValueError(f"Unsupported file type: {file_type}")
         
+        self.files[name] = FileEntry(content, file_type)
+        self._lower_names = None
+    
+    def add_file_from_path(self, name: str, path: str, file_type: str = None) -> None:
+        """
+        Add a file on disk without reading it into memory
+        The content is streamed from path when the archive is saved, so
+        the file must stay in place and unchanged until then.
+        """
+        if file_type is None:
+            file_type = _infer_type(name)
+        self._store(name, _SourceContent(path), file_type)
+    
+    def add_file_stream(self, name: str, file_obj: BinaryIO, file_type: str = None,
+                        chunk_size: int = ArchiveCommon.READ_CHUNK_SIZE) -> None:
+        """
+        Add the rest of a binary file object to the archive
+        The type is checked before anything is read, then the data is read
+        in chunk_size blocks into the buffer the archive keeps, presized
+        when the object is a regular file.
+        """
+        if file_type is None:
+            file_type = _infer_type(name)
         if not ArchiveCommon.validate_file_type(file_type):
             raise ValueError(f"Unsupported file type: {file_type}")
-            
-        if isinstance(content, str):
-            content = content.encode('utf-8')
-            
-        self.files[name] = {
-            'content': content,
-            'type': file_type
-        }
+        
+        try:
+            size = os.fstat(file_obj.fileno()).st_size - file_obj.tell()
+        except (AttributeError, OSError, ValueError):
+            size = -1  # Not backed by a file, read until EOF
+        if size < 0:
+            buf = bytearray()
+            chunk = file_obj.read(chunk_size)
+            while chunk:
+                buf += chunk
+                chunk = file_obj.read(chunk_size)
+        else:
+            buf = bytearray(size)
+            offset = 0
+            with memoryview(buf) as view:
+                while offset < size:
+                    n = file_obj.readinto(view[offset:offset + chunk_size])
+                    if not n:
+                        break
+                    offset += n
+            del buf[offset:]
+        self._store(name, buf, file_type)
+    
+    def bulk_add(self, items: Iterable[Tuple[str, bytes, str]]) -> None:
+        """
+        Add many (name, content, file_type) entries at once
+        Each distinct type is validated once, and nothing is added if any
+        of them is unsupported.
+        """
+        items = list(items)
+        bad = sorted(t for t in {t for _, _, t in items}
+                     if not ArchiveCommon.validate_file_type(t))
+        if bad:
+            raise ValueError(f"Unsupported file type: {', '.join(bad)}")
+        
+        # One update grows the table once instead of through repeated resizes
+        self.files.update({name: FileEntry(content, file_type)
+                           for name, content, file_type in items})
+        self._lower_names = None
+    
+    @staticmethod
+    def _compress_entry(info: FileEntry, compression: str) -> None:
+        """Compress an uncompressed entry in place"""
+        if compression != 'zstd':
+            raise ValueError(f"Unsupported compression: {compression}")
+        content = info.content
+        if hasattr(content, 'resolve'):
+            content = content.resolve()
+        payload, flags = ArchiveCommon.compress_content(content, info.type)
+        if flags:
+            info.content = payload
+            info.flags = flags
 
 
 
@@ -189,12 +918,11 @@ class CrudeArchiveHandler:
     
     def add_3d_model(self, name: str, file_path: str, optimize: bool = True) -> None:
         """Add 3D model with optional optimization"""
-        ext = name.split('.')[-1].lower()
+        ext = _infer_type(name).lower()
         if ext not in ArchiveCommon.MODEL_FORMATS:
             raise ValueError(f"Unsupported 3D format: {ext}")
             
-        with open(file_path, 'rb') as f:
-            raw_data = f.read()
+        raw_data = _read_file(file_path)
             
         # Validate before processing
         self._validate_3d_model(raw_data, ext)
@@ -210,8 +938,7 @@ class CrudeArchiveHandler:
         self.add_file(name, processed_data, ext)
 
         # Process features
-        model_id = name.replace('.', '_')
-        self._3d_metadata[model_id] = {
+        self._3d_metadata[name] = {
             'lod': self._generate_lods(data, ext, lod_levels),
             'animations': self._extract_animations(data, ext),
             'materials': self._extract_materials(data, ext),
@@ -221,7 +948,7 @@ class CrudeArchiveHandler:
     def add_3d_data_model(self, name: str, data: bytes, lod_levels: int = 1, 
                     include_textures: bool = False) -> None:
         """Enhanced 3D model importer"""
-        ext = name.split('.')[-1].lower()
+        ext = _infer_type(name).lower()
         if ext not in ArchiveCommon.MODEL_FORMATS:
             raise ValueError(f"Unsupported 3D format: {ext}")
     
@@ -233,8 +960,7 @@ class CrudeArchiveHandler:
         self.add_file(name, data, ext)
         
         # Process features
-        model_id = name.replace('.', '_')
-        self._3d_metadata[model_id] = {
+        self._3d_metadata[name] = {
             'lod': self._generate_lods(data, ext, lod_levels),
             'animations': self._extract_animations(data, ext),
             'materials': self._extract_materials(data, ext),
@@ -252,17 +978,25 @@ class CrudeArchiveHandler:
             pass
         return textures
     
-    def _generate_lods(self, data: bytes, ext: str, levels: int) -> Dict[int, bytes]:
-        """Generate Level of Detail variants"""
+    def _generate_lods(self, data: bytes, ext: str, levels: int) -> Dict[int, Tuple[int, int]]:
+        """
+        Generate Level of Detail variants
+        The compressed LODs are appended to the shared _lod_blob buffer,
+        the result maps each level to its (offset, length) there.
+        """
         lods = {}
+        lod_blob = self._lods()
+        self._lod_encoded = None
+        # One compression context serves every level
+        cctx = zstd.ZstdCompressor(level=ArchiveCommon.ZSTD_LEVEL) if ZSTD_AVAILABLE else None
         if ext == 'gltf':
             for i in range(levels):
                 simplified = self._simplify_gltf(data, reduction=0.2 * (i+1))
-                lods[i] = zlib.compress(simplified)
+                lods[i] = _compress_lod(simplified, lod_blob, cctx)
         elif ext == 'obj':
             for i in range(levels):
                 simplified = self._simplify_obj(data, decimate_factor=0.3 * (i+1))
-                lods[i] = simplified.encode()
+                lods[i] = _compress_lod(simplified.encode(), lod_blob, cctx)
         return lods
 
     def _extract_animations(self, data: bytes, ext: str) -> List[Dict]:
@@ -285,10 +1019,9 @@ class CrudeArchiveHandler:
         """Extract material/texture references"""
         materials = {}
         if ext == 'obj':
-            # Parse MTL references
-            mtl_lines = [l for l in data.decode('utf-8').splitlines() 
-                        if l.startswith('usemtl')]
-            materials['mtl_refs'] = [line.split()[1] for line in mtl_lines]
+            # Parse MTL references straight from the bytes
+            materials['mtl_refs'] = [m.group(1).decode('utf-8')
+                                     for m in _OBJ_USEMTL.finditer(data)]
         return materials
 
     # ======================
@@ -297,22 +1030,36 @@ class CrudeArchiveHandler:
 
     def get_model_lod(self, name: str, lod_level: int = 0) -> bytes:
         """Retrieve specific LOD version"""
-        model_id = name.replace('.', '_')
-        if lod_level not in self._3d_metadata[model_id]['lod']:
+        lods = self._3d_metadata[name]['lod']
+        if lod_level not in lods:
             raise ValueError(f"LOD level {lod_level} not available")
-        return zlib.decompress(self._3d_metadata[model_id]['lod'][lod_level])
+        key = lods[lod_level]
+        data = self._lod_cache.get(key)
+        if data is not None:
+            self._lod_cache.move_to_end(key)
+            return data
+        
+        offset, length = key
+        with memoryview(self._lods()) as view:
+            data = bytes(_decompress_lod(view[offset:offset + length]))
+        self._lod_cache[key] = data
+        if len(self._lod_cache) > _LOD_CACHE_SIZE:
+            self._lod_cache.popitem(last=False)
+        return data
+    
+    def _lods(self) -> bytearray:
+        """The shared LOD buffer, decoded from the loaded archive on first use"""
+        if self._lod_blob is None:
+            self._lod_blob = bytearray(ArchiveCommon.decode_content(self._lod_encoded))
+        return self._lod_blob
 
     def get_animations(self, name: str) -> List[Dict]:
         """Get animation data for model"""
-        model_id = name.replace('.', '_')
-        return self._3d_metadata.get(model_id, {}).get('animations', [])
+        return self._3d_metadata.get(name, {}).get('animations', [])
 
     def update_model_animation(self, name: str, anim_data: Dict) -> None:
         """Add/update animation data"""
-        model_id = name.replace('.', '_')
-        if model_id not in self._3d_metadata:
-            self._3d_metadata[model_id] = {'animations': []}
-        self._3d_metadata[model_id]['animations'].append(anim_data)
+        self._3d_metadata.setdefault(name, {'animations': []})['animations'].append(anim_data)
     
     # ======================
     # Internal Media Processors
@@ -328,7 +1075,7 @@ class CrudeArchiveHandler:
             elif ext in ('jpg', 'jpeg'):
                 metadata.update(self._parse_jpeg_segments(data))
             elif ext == 'gif':
-                width, height = struct.unpack('<HH', data[6:10])
+                width, height = _GIF_SIZE.unpack_from(data)
                 metadata.update({'width': width, 'height': height})
         except:
             pass  # Return basic info if parsing fails
@@ -344,9 +1091,10 @@ class CrudeArchiveHandler:
     def _parse_png_chunks(self, data: bytes) -> dict:
         """Extract PNG IHDR chunk data"""
         if len(data) > 24 and data[12:16] == b'IHDR':
+            width, height = _PNG_SIZE.unpack_from(data)
             return {
-                'width': struct.unpack('>I', data[16:20])[0],
-                'height': struct.unpack('>I', data[20:24])[0],
+                'width': width,
+                'height': height,
                 'bit_depth': data[24],
                 'color_type': data[25]
             }
@@ -362,11 +1110,11 @@ class CrudeArchiveHandler:
                 
             if marker[1] in (0xC0, 0xC2):  # SOF0/SOF2
                 return {
-                    'width': struct.unpack('>H', data[pos+7:pos+9])[0],
-                    'height': struct.unpack('>H', data[pos+5:pos+7])[0],
+                    'width': _U16BE.unpack_from(data, pos + 7)[0],
+                    'height': _U16BE.unpack_from(data, pos + 5)[0],
                     'components': data[pos+9]
                 }
-            pos += 2 + struct.unpack('>H', data[pos+2:pos+4])[0]
+            pos += 2 + _U16BE.unpack_from(data, pos + 2)[0]
         return {}
 
     
@@ -396,25 +1144,23 @@ class CrudeArchiveHandler:
                               data[8] << 7 | data[9]) + 10
             
         # Parse MPEG frame header (first valid frame after ID3)
-        pos = metadata.get('size', 0)
-        while pos < len(data) - 4:
-            if data[pos] == 0xFF and (data[pos+1] & 0xE0) == 0xE0:
-                frame = data[pos:pos+4]
-                version = (frame[1] >> 3) & 0x03
-                layer = (frame[1] >> 1) & 0x03
-                bitrate_idx = (frame[2] >> 4) & 0x0F
-                sample_rate_idx = (frame[2] >> 2) & 0x03
-                
-                metadata.update({
-                    'mpeg_version': ['2.5', None, '2', '1'][version],
-                    'layer': {1: 'III', 2: 'II', 3: 'I'}.get(layer),
-                    'bitrate': self._get_mp3_bitrate(version, layer, bitrate_idx),
-                    'sample_rate': self._get_mp3_sample_rate(version, sample_rate_idx),
-                    'channel_mode': ['stereo', 'joint stereo', 
-                                    'dual channel', 'mono'][(frame[3] >> 6) & 0x03]
-                })
-                break
-            pos += 1
+        # The sync pattern is matched in a single regex scan, not per 0xFF byte
+        match = _MPEG_SYNC.search(data, metadata.get('size', 0))
+        if match:
+            frame = match.group()
+            version = (frame[1] >> 3) & 0x03
+            layer = (frame[1] >> 1) & 0x03
+            bitrate_idx = (frame[2] >> 4) & 0x0F
+            sample_rate_idx = (frame[2] >> 2) & 0x03
+            
+            metadata.update({
+                'mpeg_version': ['2.5', None, '2', '1'][version],
+                'layer': {1: 'III', 2: 'II', 3: 'I'}.get(layer),
+                'bitrate': self._get_mp3_bitrate(version, layer, bitrate_idx),
+                'sample_rate': self._get_mp3_sample_rate(version, sample_rate_idx),
+                'channel_mode': ['stereo', 'joint stereo', 
+                                'dual channel', 'mono'][(frame[3] >> 6) & 0x03]
+            })
         
         return metadata
     
@@ -423,15 +1169,16 @@ class CrudeArchiveHandler:
         if len(data) < 44 or data[:4] != b'RIFF' or data[8:12] != b'WAVE':
             return {}
         
+        audio_format, channels, sample_rate, byte_rate, _, bit_depth = \
+            _WAV_FMT.unpack_from(data, 20)
+        data_len, = _WAV_DATA_LEN.unpack_from(data, 40)
         return {
-            'audio_format': struct.unpack('<H', data[20:22])[0],
-            'channels': struct.unpack('<H', data[22:24])[0],
-            'sample_rate': struct.unpack('<I', data[24:28])[0],
-            'bit_depth': struct.unpack('<H', data[34:36])[0],
-            'duration': (struct.unpack('<I', data[40:44])[0] / 
-                        (struct.unpack('<I', data[24:28])[0] /
-                        struct.unpack('<H', data[22:24])[0] /
-                        (struct.unpack('<H', data[34:36])[0] / 8)))
+            'audio_format': audio_format,
+            'channels': channels,
+            'sample_rate': sample_rate,
+            'bit_depth': bit_depth,
+            # byte_rate is sample_rate * channels * bit_depth / 8
+            'duration': data_len / byte_rate if byte_rate else 0.0
         }
     
     def _parse_ogg_header(self, data: bytes) -> dict:
@@ -439,13 +1186,14 @@ class CrudeArchiveHandler:
         if len(data) < 28 or data[:4] != b'OggS':
             return {}
         
+        sample_rate, bitrate_max, bitrate_nom, bitrate_min = _OGG_RATES.unpack_from(data)
         return {
             'version': data[4],
             'channels': data[11],
-            'sample_rate': struct.unpack('<I', data[12:16])[0],
-            'bitrate_max': struct.unpack('<I', data[16:20])[0],
-            'bitrate_nom': struct.unpack('<I', data[20:24])[0],
-            'bitrate_min': struct.unpack('<I', data[24:28])[0]
+            'sample_rate': sample_rate,
+            'bitrate_max': bitrate_max,
+            'bitrate_nom': bitrate_nom,
+            'bitrate_min': bitrate_min
         }
     
     # Video Parsers
@@ -467,24 +1215,62 @@ class CrudeArchiveHandler:
     
     def _parse_mp4_atoms(self, data: bytes) -> dict:
         """Parse MP4 container atoms"""
-        metadata = {}
-        pos = 0
-        
-        while pos < len(data) - 8:
-            atom_size = struct.unpack('>I', data[pos:pos+4])[0]
-            atom_type = data[pos+4:pos+8].decode('ascii', errors='ignore')
-            
-            if atom_type == 'moov':
-                metadata['duration'] = self._parse_moov_atom(data[pos+8:pos+atom_size])
-            elif atom_type == 'ftyp':
-                metadata['codec'] = data[pos+8:pos+12].decode('ascii', errors='ignore')
-            elif atom_type == 'tkhd' and pos + 80 < len(data):
-                # Track header contains width/height (fixed-point 16.16)
-                metadata['width'] = struct.unpack('>I', data[pos+76:pos+80])[0] / 65536
-                metadata['height'] = struct.unpack('>I', data[pos+80:pos+84])[0] / 65536
+        metadata = self._mp4_scan(data)
+        del metadata['streams']
+        return metadata
+    
+    def _mp4_scan(self, data: bytes) -> dict:
+        """
+        Collect everything read from an MP4 container in a single atom walk
+        Returns the ftyp brand as codec, duration (mvhd), width and height of
+        the first sized track (tkhd), and the type and codec of each track.
+        data may be any buffer, such as a view into the mapped archive.
+        """
+        metadata = {'streams': []}
+        stream, trak_end = None, 0
+        for atom_type, body, atom_end in _walk_atoms(data):
+            if stream is not None and body >= trak_end:
+                stream = None  # Walked past the current track
             
-            pos += atom_size
-        
+            if atom_type == b'ftyp':
+                metadata['codec'] = str(data[body:body+4], 'ascii', 'ignore')
+            elif atom_type == b'mvhd' and body < atom_end:
+                header = _MVHD_V1 if data[body] == 1 else _MVHD_V0
+                if body + header.size <= atom_end:
+                    timescale, duration = header.unpack_from(data, body)
+                    if timescale:
+                        metadata['duration'] = duration / timescale
+            elif atom_type == b'trak':
+                stream, trak_end = {'type': 'vide', 'codec': 'unknown'}, atom_end
+                metadata['streams'].append(stream)
+            elif stream is None:
+                continue
+            elif atom_type == b'tkhd' and 'width' not in metadata and body < atom_end:
+                # Track header width/height (fixed-point 16.16) after the matrix
+                offset = body + (88 if data[body] == 1 else 76)
+                if offset + 8 <= atom_end:
+                    width, height = struct.unpack_from('>II', data, offset)
+                    if width and height:
+                        metadata['width'] = width / 65536
+                        metadata['height'] = height / 65536
+            elif atom_type == b'hdlr':
+                # Media handler type, then the first sample entry format
+                stream['type'] = str(data[body+8:body+12], 'ascii', 'ignore')
+            elif atom_type == b'stsd':
+                stream['codec'] = str(data[body+12:body+16], 'ascii', 'ignore')
+            elif atom_type == b'stsz' and body + _STSZ_HEADER.size <= atom_end:
+                uniform, count = _STSZ_HEADER.unpack_from(data, body)
+                stream['sample_count'] = count
+                if uniform:
+                    stream['sample_size'] = uniform  # Every sample has this size
+                else:
+                    stream['sample_sizes'] = _read_table(
+                        data, body + _STSZ_HEADER.size, atom_end, count, _U32BE_ITEM)
+            elif atom_type in (b'stco', b'co64') and body + _TABLE_COUNT.size <= atom_end:
+                count, = _TABLE_COUNT.unpack_from(data, body)
+                item = _U32BE_ITEM if atom_type == b'stco' else _U64BE_ITEM
+                stream['chunk_offsets'] = _read_table(
+                    data, body + _TABLE_COUNT.size, atom_end, count, item)
         return metadata
     
     def _parse_avi_header(self, data: bytes) -> dict:
@@ -492,43 +1278,26 @@ class CrudeArchiveHandler:
         if len(data) < 144 or data[:4] != b'RIFF' or data[8:12] != b'AVI ':
             return {}
         
+        frames, width, height, rate, scale = _AVI_HEADER.unpack_from(data, 48)
         return {
-            'frames': struct.unpack('<I', data[48:52])[0],
-            'width': struct.unpack('<I', data[64:68])[0],
-            'height': struct.unpack('<I', data[68:72])[0],
+            'frames': frames,
+            'width': width,
+            'height': height,
             'codec': data[112:116].decode('ascii', errors='ignore').strip(),
-            'fps': struct.unpack('<I', data[80:84])[0] / 
-                   struct.unpack('<I', data[84:88])[0]
+            'fps': rate / scale
         }
     
     # Helper methods for MP3
     def _get_mp3_bitrate(self, version: int, layer: int, idx: int) -> int:
-        """MP3 bitrate lookup tables"""
-        # [version][layer][bitrate_index]
-        bitrates = [
-            [  # MPEG 1
-                [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],  # Layer I
-                [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],     # Layer II
-                [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320]       # Layer III
-            ],
-            [  # MPEG 2/2.5
-                [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],     # Layer I
-                [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],          # Layer II/III
-                [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160]           # Layer II/III
-            ]
-        ]
-        version_idx = 0 if version == 1 else 1
-        layer_idx = min(layer-1, 2)  # Convert to 0-based index
-        return bitrates[version_idx][layer_idx][idx] * 1000 if idx < 15 else 0
+        """MP3 bitrate lookup from the header's version, layer and bitrate bits"""
+        if not 1 <= layer <= 3 or idx >= 15:
+            return 0
+        # Version bits 3 = MPEG 1; layer bits 3, 2, 1 = Layer I, II, III
+        return _MP3_BITRATES[(0 if version == 3 else 3) + 3 - layer][idx] * 1000
     
     def _get_mp3_sample_rate(self, version: int, idx: int) -> int:
-        """MP3 sample rate lookup"""
-        rates = [
-            [44100, 48000, 32000],  # MPEG 1
-            [22050, 24000, 16000],   # MPEG 2
-            [11025, 12000, 8000]     # MPEG 2.5
-        ]
-        return rates[version][idx % 3]
+        """MP3 sample rate lookup from the header's version and rate bits"""
+        return _MP3_SAMPLE_RATES[version * 3 + idx] if idx < 3 else 0
    
     def _get_audio_info(self, data: bytes, ext: str) -> dict:
         """Get comprehensive audio metadata"""
@@ -543,19 +1312,31 @@ class CrudeArchiveHandler:
     
     def _get_video_info(self, data: bytes, ext: str) -> dict:
         """Get comprehensive video metadata"""
-        info = self._extract_video_metadata(data, ext)
+        if ext == 'mp4':
+            # One walk over the container supplies every field
+            info = {'type': 'video', 'format': ext}
+            info.update(self._mp4_scan(data))
+            streams = info.pop('streams')
+            duration = info.get('duration', 0)
+        else:
+            info = self._extract_video_metadata(data, ext)
+            streams = self._get_video_streams(data, ext)
+            duration = self._calculate_video_duration(data, ext)
         info.update({
             'size': len(data),
-            'duration': self._calculate_video_duration(data, ext),
-            'bitrate': self._calculate_video_bitrate(data, ext),
+            'duration': duration,
+            'bitrate': self._bitrate_mbps(len(data), duration),
             'aspect_ratio': self._calculate_aspect_ratio(info),
-            'streams' :self._get_video_streams(data, ext),
-            'codec_info':{}
+            'streams': streams
         })
         
         # Add codec-specific enhancements
         if 'codec' not in info:
             info['codec'] = self._detect_video_codec(data, ext)
+        # The video track's sample entry names the codec, the brand does not
+        codec = next((stream['codec'] for stream in streams
+                      if stream.get('type') in ('vide', 'video')), info['codec'])
+        info['codec_info'] = self._get_video_codec_info(data, codec)
         
         return info
     
@@ -569,10 +1350,8 @@ class CrudeArchiveHandler:
             if ext == 'mp3':
                 return self._get_mp3_duration(data)
             elif ext == 'wav':
-                return struct.unpack('<I', data[40:44])[0] / (
-                       struct.unpack('<I', data[24:28])[0] *
-                       struct.unpack('<H', data[22:24])[0] *
-                       (struct.unpack('<H', data[34:36])[0] / 8))
+                channels, sample_rate, bits, data_size = _WAV_TIMING.unpack_from(data)
+                return data_size / (sample_rate * channels * (bits / 8))
             elif ext == 'ogg':
                 return len(data) / (self._get_ogg_bitrate(data) / 8)
         except:
@@ -592,7 +1371,7 @@ class CrudeArchiveHandler:
         # Extract raw cover art bytes
         raw_data = None
         data = self.get_file(filename)
-        ext = self.files[filename]['type'].lower()
+        ext = self.files[filename].type.lower()
         
         if ext == 'mp3':
             raw_data = self._extract_mp3_cover(data)
@@ -653,36 +1432,64 @@ class CrudeArchiveHandler:
     def _extract_mp3_cover(self, data: bytes) -> Optional[bytes]:
         """Extract cover from ID3v2 tags"""
         if len(data) > 10 and data[:3] == b'ID3':
-            tag_size = (data[6] << 21 | data[7] << 14 | 
-                      data[8] << 7 | data[9]) + 10
+            tag_size = min((data[6] << 21 | data[7] << 14 | 
+                            data[8] << 7 | data[9]) + 10, len(data))
+            syncsafe = data[3] >= 4  # ID3v2.4 frame sizes are synch-safe
             pos = 10
             
-            while pos < tag_size - 10:
-                frame_id = data[pos:pos+4]
-                frame_size = struct.unpack('>I', data[pos+4:pos+8])[0]
+            while pos + _ID3_FRAME.size <= tag_size:
+                frame_id, frame_size = _ID3_FRAME.unpack_from(data, pos)
+                if frame_id[0] == 0:
+                    break  # Padding, no frames follow
+                if syncsafe:
+                    frame_size = ((frame_size >> 3) & 0xFE00000 | (frame_size >> 2) & 0x1FC000 |
+                                  (frame_size >> 1) & 0x3F80 | frame_size & 0x7F)
+                pos += _ID3_FRAME.size
                 
                 if frame_id == b'APIC':
-                    # Skip header to get to image data
-                    return data[pos+10:pos+frame_size]
-                pos += 10 + frame_size
+                    return self._parse_apic_frame(data[pos:pos + frame_size])
+                pos += frame_size
         return None
     
+    @staticmethod
+    def _parse_apic_frame(frame: bytes) -> Optional[bytes]:
+        """Picture bytes of an ID3 APIC frame body"""
+        if len(frame) < 4:
+            return None
+        # Text encoding, NUL terminated MIME type, picture type, description
+        terminator = b'\x00\x00' if frame[0] in (1, 2) else b'\x00'
+        pos = frame.find(b'\x00', 1) + 2
+        if pos < 2:
+            return None
+        end = frame.find(terminator, pos)
+        while len(terminator) == 2 and end >= 0 and (end - pos) % 2:
+            end = frame.find(terminator, end + 1)  # UTF-16 NULs are code unit aligned
+        if end < 0:
+            return None
+        return frame[end + len(terminator):]
+    
     def _extract_flac_cover(self, data: bytes) -> Optional[bytes]:
         """Extract cover from FLAC metadata"""
         if len(data) > 4 and data[:4] == b'fLaC':
             pos = 4
-            while pos < len(data) - 4:
-                header = data[pos:pos+4]
-                block_type = header[0] & 0x7F
-                block_size = struct.unpack('>I', b'\x00' + header[1:4])[0]
+            while pos + 8 <= len(data):
+                header, = _FLAC_BLOCK.unpack_from(data, pos)
+                block_type = (header >> 24) & 0x7F
+                block_size = header & 0xFFFFFF
+                pos += 4
                 
                 if block_type == 6:  # PICTURE block
-                    # Parse FLAC picture structure
-                    pic_type = struct.unpack('>I', data[pos+4:pos+8])[0]
+                    # type, MIME string, description, 4 dimension fields, data
+                    pic_type, = _U32BE.unpack_from(data, pos)
                     if pic_type == 3:  # Front cover
-                        offset = pos + 32
-                        return data[offset:offset+block_size-28]
-                pos += 4 + block_size
+                        offset = pos + 4
+                        offset += 4 + _U32BE.unpack_from(data, offset)[0]
+                        offset += 4 + _U32BE.unpack_from(data, offset)[0] + 16
+                        length, = _U32BE.unpack_from(data, offset)
+                        return data[offset + 4:offset + 4 + length]
+                if header & 0x80000000:
+                    break  # Last metadata block, audio frames follow
+                pos += block_size
         return None
     
     # ======================
@@ -694,32 +1501,7 @@ class CrudeArchiveHandler:
         streams = []
         
         if ext == 'mp4':
-            # Parse MP4 track headers
-            pos = 0
-            while pos < len(data) - 8:
-                size = struct.unpack('>I', data[pos:pos+4])[0]
-                atom_type = data[pos+4:pos+8]
-                
-                if atom_type == b'trak':
-                    stream_type = b'vide'
-                    codec = b'unknown'
-                    # Look for media handler type and codec
-                    sub_pos = pos + 8
-                    while sub_pos < pos + size:
-                        sub_size = struct.unpack('>I', data[sub_pos:sub_pos+4])[0]
-                        sub_type = data[sub_pos+4:sub_pos+8]
-                        
-                        if sub_type == b'hdlr':
-                            stream_type = data[sub_pos+16:sub_pos+20]
-                        elif sub_type == b'stsd':
-                            codec = data[sub_pos+12:sub_pos+16]
-                        sub_pos += sub_size
-                    
-                    streams.append({
-                        'type': stream_type.decode('ascii', errors='ignore'),
-                        'codec': codec.decode('ascii', errors='ignore')
-                    })
-                pos += size
+            streams = self._mp4_scan(data)['streams']
         
         elif ext == 'avi':
             # Parse AVI stream headers
@@ -742,16 +1524,20 @@ class CrudeArchiveHandler:
             if ext == 'mp4':
                 return self._parse_mp4_atoms(data).get('duration', 0)
             elif ext == 'avi':
-                return (struct.unpack('<I', data[48:52])[0] / 
-                       struct.unpack('<I', data[32:36])[0])
+                frame_time, frames = _AVI_TIMING.unpack_from(data)
+                return frames / frame_time
         except:
             return 0.0
     
     def _calculate_video_bitrate(self, data: bytes, ext: str) -> float:
         """Calculate average bitrate in Mbps"""
-        duration = self._calculate_video_duration(data, ext)
-        if duration > 0:
-            return (len(data) * 8) / (duration * 1000000)
+        return self._bitrate_mbps(len(data), self._calculate_video_duration(data, ext))
+    
+    @staticmethod
+    def _bitrate_mbps(size: int, duration: float) -> float:
+        """Average bitrate in Mbps of size bytes played over duration seconds"""
+        if duration and duration > 0:
+            return (size * 8) / (duration * 1000000)
         return 0.0
     
     def _calculate_aspect_ratio(self, metadata: dict) -> str:
@@ -762,27 +1548,19 @@ class CrudeArchiveHandler:
         width = metadata['width']
         height = metadata['height']
         
-        # Common aspect ratios with tolerance
-        ratios = {
-            (16, 9): '16:9',
-            (4, 3): '4:3',
-            (1, 1): '1:1'
-        }
+        # Whole float sizes hash like ints, so the frame header's 1920.0 hits too
+        common = _COMMON_DIMENSIONS.get((width, height))
+        if common is not None:
+            return common
         
-        for (w, h), ratio in ratios.items():
-            if abs(width/height - w/h) < 0.05:
-                return ratio
+        ratio = width / height
+        for target, label in _ASPECT_RATIOS:
+            if abs(ratio - target) < 0.05:
+                return label
         
         # Return calculated ratio if no match
-        gcd = self._gcd(round(width), round(height))
+        gcd = math.gcd(round(width), round(height))
         return f"{round(width/gcd)}:{round(height/gcd)}"
-    
-    @staticmethod
-    def _gcd(a: int, b: int) -> int:
-        """Greatest common divisor helper"""
-        while b:
-            a, b = b, a % b
-        return a
 
 
     # ======================
@@ -792,28 +1570,21 @@ class CrudeArchiveHandler:
     def _get_h264_info(self, data: bytes) -> Dict:
         """Parse H.264-specific parameters from MP4/AVC"""
         info = {}
-        pos = 0
-        
-        while pos < len(data) - 8:
-            size = struct.unpack('>I', data[pos:pos+4])[0]
-            atom_type = data[pos+4:pos+8]
-            
-            if atom_type == b'avcC':
-                # AVC Configuration Atom
-                info['profile'] = data[pos+12]
-                info['level'] = data[pos+13]
-                info['nalu_size'] = (data[pos+14] & 0x03) + 1
-                break
-                
-            pos += size
-        
+        found = _find_codec_config(data, b'avcC')
+        if found and found[0] + 5 <= found[1]:
+            # AVC decoder configuration record: version, profile,
+            # compatibility, level, then the NALU length size
+            body = found[0]
+            info['profile'] = data[body+1]
+            info['level'] = data[body+3]
+            info['nalu_size'] = (data[body+4] & 0x03) + 1
         return info
     
     def _get_video_codec_info(self, data: bytes, codec: str) -> Dict:
         """Get codec-specific parameters"""
         if codec.lower() in ('avc1', 'h264'):
             return self._get_h264_info(data)
-        elif codec.lower() == 'hev1':
+        elif codec.lower() in ('hev1', 'hvc1'):
             return self._get_hevc_info(data)
         return {}
     
@@ -821,20 +1592,14 @@ class CrudeArchiveHandler:
     def _get_hevc_info(self, data: bytes) -> Dict:
         """Parse HEVC/H.265 parameters"""
         info = {}
-        pos = 0
-        
-        while pos < len(data) - 8:
-            size = struct.unpack('>I', data[pos:pos+4])[0]
-            atom_type = data[pos+4:pos+8]
-            
-            if atom_type == b'hvcC':
-                info['profile'] = data[pos+12]
-                info['tier'] = (data[pos+13] & 0xC0) >> 6
-                info['level'] = data[pos+13] & 0x3F
-                break
-                
-            pos += size
-        
+        found = _find_codec_config(data, b'hvcC')
+        if found and found[0] + 13 <= found[1]:
+            # HEVC decoder configuration record: profile space, tier and
+            # profile idc share a byte, the level idc follows the flags
+            body = found[0]
+            info['profile'] = data[body+1] & 0x1F
+            info['tier'] = (data[body+1] >> 5) & 0x01
+            info['level'] = data[body+12]
         return info
 
     def _simplify_gltf(self, data: bytes, reduction: float) -> bytes:
@@ -844,66 +1609,38 @@ class CrudeArchiveHandler:
 
     def _parse_fbx_anim(self, data: bytes) -> List:
         """FBX animation parser (simplified)"""
-        # Look for FBX animation blocks
-        anim_blocks = []
-        pos = data.find(b'AnimationStack')
-        while pos != -1:
-            end_pos = data.find(b'}', pos)
-            anim_blocks.append(data[pos:end_pos+1])
-            pos = data.find(b'AnimationStack', end_pos)
-        return anim_blocks
+        # Look for FBX animation blocks, each up to its closing brace
+        return _FBX_ANIM_BLOCK.findall(data)
     
     def get_model_as_numpy(self, filename: str) -> np.ndarray:
         """Convert supported 3D models to numpy arrays"""
         if not NUMPY_AVAILABLE:
             raise ImportError("numpy is required for this feature")
         
-        if filename not in self.files:
+        entry = self.files.get(filename)
+        if entry is None:
             raise FileNotFoundError(f"{filename} not in archive")
             
-        ext = self.files[filename]['type']
-        data = self.get_file(filename)
-        
+        ext = entry.type
         if ext == 'npy':
-            return np.load(io.BytesIO(data))
+            with self.get_file_view(filename) as view:
+                return _load_npy(view)
         elif ext == 'obj':
-            return self._obj_to_numpy(data)
+            return self._obj_to_numpy(self._entry_content(entry))
         # Add other converters as needed
     
     def _obj_to_numpy(self, obj_data: bytes) -> np.ndarray:
         """Simple OBJ to numpy converter (vertices only)"""
         import numpy as np
-        vertices = []
-        for line in obj_data.decode('utf-8').splitlines():
-            if line.startswith('v '):
-                vertices.append([float(x) for x in line[2:].split()])
-        return np.array(vertices, dtype=np.float32)
+        # NumPy converts the matched coordinate bytes to floats in C
+        return np.array(_OBJ_VERTEX.findall(obj_data), dtype=np.float32)
     
     def validate_media_file(self, data: bytes, file_type: str) -> bool:
         """Validate media files by magic numbers and structure"""
-        file_type = file_type.lower()
-        signatures = {
-            'png': b'\x89PNG',
-            'jpg': b'\xFF\xD8',
-            'gif': b'GIF',
-            'bmp': b'BM',
-            'mp3': (b'ID3', lambda d: d[1:4] == b'MP3'),
-            'wav': (b'RIFF', lambda d: d[8:12] == b'WAVE'),
-            'mp4': (b'\x00\x00\x00\x18ftyp', lambda d: d[4:8] == b'ftyp')
-        }
-        
-        if file_type not in signatures:
+        check = _MEDIA_SIGNATURES.get(file_type.lower())
+        if check is None:
             return True  # Skip validation for types without known signatures
-            
-        check = signatures[file_type]
-        if isinstance(check, bytes):
-            return data.startswith(check)
-        elif callable(check):
-            return check(data)
-        elif isinstance(check, tuple):
-            return any(data.startswith(s) if isinstance(s, bytes) else s(data) 
-                   for s in check)
-        return False
+        return check(data)
    
     def get_media_info(self, filename: str) -> dict:
         """Get metadata for media files"""
@@ -911,14 +1648,20 @@ class CrudeArchiveHandler:
             raise FileNotFoundError(f"File {filename} not in archive")
         
         file_info = self.files[filename]
-        ext = file_info['type'].lower()
-        
-        if ext in {'png', 'jpg', 'jpeg', 'gif', 'bmp', 'tga'}:
-            return self._get_image_info(file_info['content'], ext)
+        ext = file_info.type.lower()
+        
+        if ext in {'png', 'jpg', 'jpeg', 'gif', 'bmp', 'tga'} or ext == 'mp4':
+            # These parsers only index and unpack, so they can read a view
+            # into the mapped archive instead of a copy of the whole file
+            parse = self._get_image_info if ext != 'mp4' else self._get_video_info
+            if file_info.info is not None:
+                return self._parsed_info(filename, parse)
+            with self.get_file_view(filename) as view:
+                return self._parsed_info(filename, parse, view)
         elif ext in {'mp3', 'wav', 'ogg'}:
-            return self._get_audio_info(file_info['content'], ext)
-        elif ext in {'mp4', 'avi', 'mov'}:
-            return self._get_video_info(file_info['content'], ext)
+            return self._parsed_info(filename, self._get_audio_info)
+        elif ext in {'avi', 'mov'}:
+            return self._parsed_info(filename, self._get_video_info)
         else:
             return {'error': 'Unsupported media type'}
 
@@ -936,54 +1679,206 @@ class CrudeArchiveHandler:
         return True
     
     def get_file(self, name: str) -> Optional[bytes]:
-        """Get file content by name"""
-        if name in self.files:
-            return self.files[name]['content']
-        return None
+        """Get file content by name, decoding it on first access"""
+        entry = self.files.get(name)
+        if entry is None:
+            return None
+        return self._entry_content(entry)
+    
+    @staticmethod
+    def _entry_content(entry: FileEntry) -> bytes:
+        """Decoded content of an entry already looked up, see get_file()"""
+        content = entry.content
+        if isinstance(content, _LazyContent):
+            content = entry.content = content.resolve()
+        elif isinstance(content, (_MappedContent, _SourceContent)):
+            content = content.resolve()
+        elif isinstance(content, _TextBuffer):
+            content = bytes(content)  # Later edits must not show through
+        if entry.flags:
+            content = ArchiveCommon.decompress_content(content, entry.flags)
+        return content
+    
+    def get_file_view(self, name: str) -> Optional[memoryview]:
+        """
+        Get file content as a read-only memoryview
+        Uncompressed entries of a loaded archive are viewed in place in the
+        mapped file without copying. The view refers to the archive as it was
+        loaded or last saved and should be released once no longer needed.
+        """
+        entry = self.files.get(name)
+        if entry is None:
+            return None
+        content = entry.content
+        if isinstance(content, _MappedContent) and not entry.flags:
+            return content.view()
+        view = memoryview(self._entry_content(entry))
+        if view.readonly:
+            return view
+        if hasattr(view, 'toreadonly'):
+            return view.toreadonly()
+        return memoryview(bytes(view))  # Python 3.7 has no toreadonly()
+    
+    def open_stream(self, name: str) -> BinaryIO:
+        """
+        Open a file's decoded content for reading as a binary file object
+        Content is read as it is consumed, from the mapped archive or the
+        source file, and compressed files are decompressed incrementally.
+        Close the stream when done, it can keep the mapping alive.
+        """
+        entry = self.files.get(name)
+        if entry is None:
+            raise FileNotFoundError(f"File {name} not in archive")
+        content = entry.content
+        if isinstance(content, _SourceContent):
+            return open(content.path, 'rb')
+        if isinstance(content, _MappedContent):
+            raw = _ViewReader(content.view())
+        else:
+            if isinstance(content, _LazyContent):
+                content = entry.content = content.resolve()
+            elif isinstance(content, _TextBuffer):
+                content = bytes(content)  # A view would block later edits
+            raw = _ViewReader(memoryview(content))
+        if entry.flags:
+            if not ZSTD_AVAILABLE:
+                raw.close()
+                raise ImportError("zstandard is required to read zstd compressed files")
+            return zstd.ZstdDecompressor().stream_reader(raw, closefd=True)
+        return raw
+    
+    def get_meta(self, name: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a file's type and sizes without reading its content
+        size is the decoded size, stored_size what the archive holds. For
+        zstd compressed files size comes from the frame header.
+        """
+        entry = self.files.get(name)
+        if entry is None:
+            return None
+        stored_size = len(entry.content)
+        meta = {'type': entry.type, 'size': stored_size,
+                'stored_size': stored_size, 'compressed': bool(entry.flags)}
+        if entry.flags:
+            if not ZSTD_AVAILABLE:
+                raise ImportError("zstandard is required to read zstd compressed files")
+            size = zstd.frame_content_size(self._stored_bytes(entry, 0, _ZSTD_FRAME_HEADER_MAX))
+            meta['size'] = size if size >= 0 else len(self._entry_content(entry))
+        if entry.metadata:
+            meta['metadata'] = entry.metadata
+        return meta
+    
+    def get_bytes(self, name: str, offset: int = 0, length: Optional[int] = None) -> Optional[bytes]:
+        """
+        Get length bytes of a file's decoded content starting at offset
+        Uncompressed files are read from where they are stored without the
+        rest of their content, compressed ones are only decompressed up to
+        the end of the range.
+        """
+        entry = self.files.get(name)
+        if entry is None:
+            return None
+        stop = len(entry.content) if length is None else offset + length
+        if not entry.flags:
+            return self._stored_bytes(entry, offset, stop)
+        if not ZSTD_AVAILABLE:
+            raise ImportError("zstandard is required to read zstd compressed files")
+        if length is None:
+            return self._entry_content(entry)[offset:]
+        
+        content = entry.content
+        payload = content.view() if isinstance(content, _MappedContent) else content
+        out = bytearray()
+        with zstd.ZstdDecompressor().stream_reader(payload) as reader:
+            reader.seek(offset)
+            while len(out) < length:
+                chunk = reader.read(length - len(out))
+                if not chunk:
+                    break
+                out += chunk
+        if isinstance(payload, memoryview):
+            payload.release()
+        return bytes(out)
+    
+    @staticmethod
+    def _stored_bytes(entry: FileEntry, start: int, stop: int) -> bytes:
+        """Copy of entry's stored payload[start:stop], reading only that range"""
+        content = entry.content
+        if isinstance(content, _MappedContent):
+            start = min(start, content.length)
+            stop = min(max(stop, start), content.length)
+            return content.mm[content.offset + start:content.offset + stop]
+        if isinstance(content, _SourceContent):
+            with open(content.path, 'rb') as f:
+                f.seek(start)
+                return f.read(max(stop - start, 0))
+        if isinstance(content, _LazyContent):
+            content = entry.content = content.resolve()
+        return bytes(content[start:stop])
     
     def get_file_info(self, name: str) -> Optional[Dict[str, Any]]:
         """Get file info by name"""
-        if name in self.files:
-            return self.files[name]
-        return None
+        entry = self.files.get(name)
+        if entry is None:
+            return None
+        # Info consumers expect decoded content, not the stored payload
+        info = {'type': entry.type, 'content': self._entry_content(entry)}
+        if entry.metadata:
+            info['metadata'] = entry.metadata
+        return info
     
     def remove_file(self, name: str) -> None:
         """Remove a file from the archive"""
-        if name in self.files:
-            del self.files[name]
+        self.files.pop(name, None)
+        self._lower_names = None
     
     def list_files(self) -> list:
         """List all files in the archive"""
         return list(self.files.keys())
     
+    def iter_file_meta(self) -> Iterator[Tuple[str, str]]:
+        """Yield (name, type) for every file without touching its content"""
+        for name, entry in self.files.items():
+            yield name, entry.type
+    
     def add_numeric_data(self, name: str, array: 'np.ndarray', compress: bool = True) -> None:
-        """Add numpy array with optional compression"""
+        """
+        Add numpy array with optional compression
+        A compressed .npz is stored uncompressed inside and compressed with
+        zstd by the archive, several times faster than DEFLATE. Without
+        zstandard installed it falls back to np.savez_compressed.
+        """
         if not NUMPY_AVAILABLE:
             raise ImportError("numpy is required for numeric data support")
         
-        ext = name.split('.')[-1].lower()
+        ext = _infer_type(name).lower()
         if ext not in {'npy', 'npz'}:
             raise ValueError("Only .npy and .npz formats supported")
         
         bio = io.BytesIO()
+        compression = None
         if ext == 'npy':
             np.save(bio, array)
-        else:  # npz
+        elif compress and not ZSTD_AVAILABLE:
             np.savez_compressed(bio, data=array)
+        else:  # npz
+            np.savez(bio, data=array)
+            compression = 'zstd' if compress else None
         
-        self.add_file(name, bio.getvalue(), ext)
+        self.add_file(name, bio.getvalue(), ext, compression=compression)
     
     def get_numeric_data(self, name: str) -> 'np.ndarray':
         """Retrieve numeric data as numpy array"""
         if not NUMPY_AVAILABLE:
             raise ImportError("numpy is required for this feature")
         
-        data = self.get_file(name)
-        ext = name.split('.')[-1].lower()
-        
+        ext = _infer_type(name).lower()
         if ext == 'npy':
-            return np.load(io.BytesIO(data))
-        elif ext == 'npz':
+            with self.get_file_view(name) as view:
+                return _load_npy(view)
+        
+        data = self.get_file(name)
+        if ext == 'npz':
             return np.load(io.BytesIO(data))['data']
         else:
             raise ValueError("Unsupported numeric format")
@@ -998,24 +1893,52 @@ class CrudeArchiveHandler:
     def add_text_data(self, filename: str, text_data: str, file_type: str = None) -> None:
         """Add text data directly to the archive"""
         if file_type is None:
-            file_type = filename.split('.')[-1] if '.' in filename else 'txt'
-        self.add_file(filename, text_data.encode('utf-8'), file_type)
+            file_type = _infer_type(filename, 'txt')
+        self._store(filename, text_data.encode('utf-8'), file_type)
     
     def insert_text_at_index(self, filename: str, text: str, index: int) -> None:
         """Insert text at specific position in a text file"""
+        buf = self._text_buffer(filename)
+        pos = self._text_offset(buf, index)
+        buf[pos:pos] = text.encode('utf-8')
+    
+    def _text_buffer(self, filename: str) -> _TextBuffer:
+        """
+        Content of a text file as a buffer the text methods edit in place
+        The entry is converted and validated on the first edit only, so
+        repeated edits do not decode and re-encode the whole file.
+        """
         if filename not in self.files:
             raise FileNotFoundError(f"File {filename} not in archive")
-        
-        current_content = self.get_file_as_text(filename)
-        if current_content is None:
-            raise ValueError("File is not a text file")
-        
-        new_content = current_content[:index] + text + current_content[index:]
-        self.add_text_data(filename, new_content)
+        self.flush_json(filename)
+        entry = self.files[filename]
+        if not isinstance(entry.content, _TextBuffer) or entry.flags:
+            buf = _TextBuffer(self.get_file(filename))
+            try:
+                buf.decode('utf-8')
+            except UnicodeDecodeError:
+                raise ValueError("File is not a text file")
+            entry = self.files[filename] = FileEntry(buf, entry.type)
+        entry.info = None
+        entry.json_doc = None
+        return entry.content
+    
+    @staticmethod
+    def _text_offset(buf: bytearray, index: int) -> int:
+        """Byte offset in buf of character index, clamped like str slicing"""
+        if buf.isascii():
+            return slice(index, None).indices(len(buf))[0]
+        return len(buf.decode('utf-8')[:index].encode('utf-8'))
     def copy_text_block(self, filename: str, start_row: int, start_col: int, 
                        end_row: int, end_col: int) -> str:
         """Extract rectangular text region between coordinates"""
-        lines = self.get_text_lines(filename)
+        return self._copy_block(self.get_text_lines(filename),
+                                start_row, start_col, end_row, end_col)
+    
+    @staticmethod
+    def _copy_block(lines: List[str], start_row: int, start_col: int,
+                    end_row: int, end_col: int) -> str:
+        """copy_text_block on already split lines"""
         if not (0 <= start_row < len(lines) and 0 <= end_row < len(lines)):
             raise IndexError("Row index out of range")
         
@@ -1029,42 +1952,60 @@ class CrudeArchiveHandler:
     def move_text_block(self, filename: str, start_row: int, start_col: int,
                        end_row: int, end_col: int, dest_row: int, dest_col: int) -> None:
         """Cut text from source region and paste at destination"""
-        content = self.copy_text_block(filename, start_row, start_col, end_row, end_col)
-        self.remove_text_row_at_index(filename, start_row, start_col, end_col)
-        self.insert_text_at_position(filename, content, dest_row, dest_col)
-        def truncate_text_row(self, filename: str, start: int, end: int) -> None:
-            """Remove text between indices and shift remaining content left"""
-            if filename not in self.files:
-                raise FileNotFoundError(f"File {filename} not in archive")
-            
-            current_content = self.get_file_as_text(filename)
-            if current_content is None:
-                raise ValueError("File is not a text file")
-            
-            # Shift remaining content left
-            new_content = current_content[:start] + current_content[end:]
-            self.add_text_data(filename, new_content)
+        def move(lines: List[str]) -> None:
+            content = self._copy_block(lines, start_row, start_col, end_row, end_col)
+            self._blank_row_range(lines, start_row, start_col, end_col)
+            self._insert_in_lines(lines, content, dest_row, dest_col)
+        self._mutate_lines(filename, move)
     
-    def remove_text_row_at_index(self, filename: str, row: int, col_start: int, col_end: int) -> None:
-        """Remove text from specific row/columns without shifting remaining lines"""
+    def _mutate_lines(self, filename: str, edit) -> None:
+        """
+        Apply edit(lines) to the lines of a text file and store it once
+        Line based operations share this, so a compound edit such as
+        move_text_block splits and rewrites the file a single time.
+        """
         if filename not in self.files:
             raise FileNotFoundError(f"File {filename} not in archive")
-        
+        self.flush_json(filename)
         lines = self.get_text_lines(filename)
+        edit(lines)
+        self.add_text_data(filename, '\n'.join(lines))
+    
+    def truncate_text_row(self, filename: str, start: int, end: int) -> None:
+        """Remove text between indices and shift remaining content left"""
+        buf = self._text_buffer(filename)
+        start, end = self._text_offset(buf, start), self._text_offset(buf, end)
+        # Shift remaining content left
+        if start <= end:
+            del buf[start:end]
+        else:
+            buf[start:] = buf[end:]  # Overlapping range, kept as with str slicing
+    
+    def remove_text_row_at_index(self, filename: str, row: int, col_start: int, col_end: int) -> None:
+        """Remove text from specific row/columns without shifting remaining lines"""
+        self._mutate_lines(filename, lambda lines: self._blank_row_range(
+            lines, row, col_start, col_end))
+    
+    @staticmethod
+    def _blank_row_range(lines: List[str], row: int, col_start: int, col_end: int) -> None:
+        """remove_text_row_at_index on already split lines"""
         if row >= len(lines):
             raise IndexError(f"Row {row} out of range")
         
         # Replace specified columns with empty space while preserving line structure
         line = lines[row]
-        new_line = line[:col_start] + ' '*(col_end-col_start) + line[col_end:]
-        lines[row] = new_line
-        
-        self.add_text_data(filename, '\n'.join(lines))
+        lines[row] = line[:col_start] + ' '*(col_end-col_start) + line[col_end:]
     
     def remove_text_column(self, filename: str, col_start: int, col_end: int) -> None:
         """Remove vertical column range from all lines"""
         if filename not in self.files:
             raise FileNotFoundError(f"File {filename} not in archive")
+        self.flush_json(filename)
+        
+        fixed = _remove_fixed_width_column(self.get_file(filename), col_start, col_end)
+        if fixed is not None:
+            self._store(filename, fixed, self.files[filename].type)
+            return
         
         lines = self.get_text_lines(filename)
         modified_lines = []
@@ -1081,11 +2022,12 @@ class CrudeArchiveHandler:
     
     def insert_text_at_position(self, filename: str, text: str, row: int, col: int) -> None:
         """Insert text at specific row/column position"""
-        if filename not in self.files:
-            raise FileNotFoundError(f"File {filename} not in archive")
-        
-        lines = self.get_text_lines(filename)
-        
+        self._mutate_lines(filename, lambda lines: self._insert_in_lines(
+            lines, text, row, col))
+    
+    @staticmethod
+    def _insert_in_lines(lines: List[str], text: str, row: int, col: int) -> None:
+        """insert_text_at_position on already split lines"""
         # Handle row overflow
         while row >= len(lines):
             lines.append('')
@@ -1096,35 +2038,26 @@ class CrudeArchiveHandler:
             line += ' ' * (col - len(line))
         
         lines[row] = line[:col] + text + line[col:]
-        self.add_text_data(filename, '\n'.join(lines))
     
     # Additional quality-of-life functions
     def append_text(self, filename: str, text: str) -> None:
         """Append text to an existing file"""
-        if filename not in self.files:
-            raise FileNotFoundError(f"File {filename} not in archive")
-        
-        current_content = self.get_file_as_text(filename) or ""
-        self.add_text_data(filename, current_content + text)
+        self._text_buffer(filename).extend(text.encode('utf-8'))
     
     def prepend_text(self, filename: str, text: str) -> None:
         """Prepend text to an existing file"""
-        if filename not in self.files:
-            raise FileNotFoundError(f"File {filename} not in archive")
-        
-        current_content = self.get_file_as_text(filename) or ""
-        self.add_text_data(filename, text + current_content)
+        self._text_buffer(filename)[:0] = text.encode('utf-8')
     
     def replace_text(self, filename: str, old: str, new: str) -> None:
         """Replace all occurrences of text in a file"""
-        if filename not in self.files:
-            raise FileNotFoundError(f"File {filename} not in archive")
-        
-        current_content = self.get_file_as_text(filename)
-        if current_content is None:
-            raise ValueError("File is not a text file")
-        
-        self.add_text_data(filename, current_content.replace(old, new))
+        buf = self._text_buffer(filename)
+        if not old:
+            # An empty match falls between every character, not every byte
+            buf[:] = buf.decode('utf-8').replace(old, new).encode('utf-8')
+            return
+        # UTF-8 is self-synchronizing, so replacing a non-empty byte string
+        # replaces characters
+        buf[:] = buf.replace(old.encode('utf-8'), new.encode('utf-8'))
     
     def get_text_lines(self, filename: str) -> List[str]:
         """Get text file content as lines"""
@@ -1133,37 +2066,61 @@ class CrudeArchiveHandler:
             raise ValueError("File is not a text file")
         return content.splitlines()
     
-    def update_json_value(self, filename: str, key: str, value: Any) -> None:
-        """Update a value in a JSON file"""
+    def update_json_value(self, filename: str, key: str, value: Any,
+                          defer_serialize: bool = False) -> None:
+        """
+        Update a value in a JSON file
+        The parsed document is cached, so repeated updates do not parse the
+        file again. With defer_serialize=True only the cached document is
+        changed until flush_json() or save() writes it out.
+        """
         if filename not in self.files:
             raise FileNotFoundError(f"File {filename} not in archive")
         
-        try:
-            data = json.loads(self.get_file_as_text(filename))
-            data[key] = value
-            self.add_dict_as_json(filename, data)
-        except json.JSONDecodeError:
-            raise ValueError("File is not valid JSON")
+        entry = self.files[filename]
+        if entry.json_doc is None:
+            try:
+                entry.json_doc = json.loads(self.get_file_as_text(filename))
+            except json.JSONDecodeError:
+                raise ValueError("File is not valid JSON")
+        entry.json_doc[key] = value
+        entry.json_dirty = True
+        if not defer_serialize:
+            self.flush_json(filename)
+    
+    def flush_json(self, filename: str) -> None:
+        """Write out a JSON document changed by deferred update_json_value calls"""
+        entry = self.files.get(filename)
+        if entry is None or not entry.json_dirty:
+            return
+        data = entry.json_doc
+        entry.json_dirty = False
+        self.add_dict_as_json(filename, data)
+        # Written under the name add_dict_as_json picked, keep it parsed there
+        if not filename.lower().endswith('.json'):
+            filename += '.json'
+        self.files[filename].json_doc = data
 
     def add_binary_data(self, filename: str, binary_data: bytes, file_type: str = None) -> None:
         """Add binary data directly to the archive"""
         if file_type is None:
-            file_type = filename.split('.')[-1] if '.' in filename else 'bin'
-        self.add_file(filename, binary_data, file_type)
+            file_type = _infer_type(filename)
+        self._store(filename, binary_data, file_type)
     
     def get_binary_data(self, filename: str) -> dict:
         """Get raw binary data and file info"""
         if filename not in self.files:
             raise FileNotFoundError(f"File {filename} not in archive")
+        data = self.get_file(filename)
         return {
-            'data': self.get_file(filename),
-            'type': self.files[filename]['type'],
-            'size': len(self.files[filename]['content'])
+            'data': data,
+            'type': self.files[filename].type,
+            'size': len(data)
         }
 
     def add_font(self, name: str, font_data: bytes) -> None:
         """Add font file with validation"""
-        ext = name.split('.')[-1].lower()
+        ext = _infer_type(name).lower()
         if ext not in {'ttf', 'otf', 'woff', 'woff2'}:
             raise ValueError(f"Unsupported font format: {ext}")
         
@@ -1175,7 +2132,7 @@ class CrudeArchiveHandler:
     
     def add_image(self, name: str, image_data: bytes) -> None:
         """Add image with format validation and metadata extraction"""
-        ext = name.split('.')[-1].lower()
+        ext = _infer_type(name).lower()
         if ext not in {'png', 'jpg', 'jpeg', 'gif', 'bmp', 'tga'}:
             raise ValueError(f"Unsupported image format: {ext}")
         
@@ -1189,31 +2146,44 @@ class CrudeArchiveHandler:
         """Get raw image bytes and metadata"""
         if name not in self.files:
             raise FileNotFoundError(f"File {name} not in archive")
-        ext = self.files[name]['type'].lower()
+        data = self.get_file(name)
         return {
-            'data': self.get_file(name),
-            'metadata': self._get_image_info(self.files[name]['content'], ext)
+            'data': data,
+            'metadata': self._parsed_info(name, self._get_image_info, data)
         }
     
     def get_audio_data(self, name: str) -> dict:
         """Get raw audio bytes and metadata"""
         if name not in self.files:
             raise FileNotFoundError(f"File {name} not in archive")
-        ext = self.files[name]['type'].lower()
+        data = self.get_file(name)
         return {
-            'data': self.get_file(name),
-            'metadata': self._get_audio_info(self.files[name]['content'], ext)
+            'data': data,
+            'metadata': self._parsed_info(name, self._get_audio_info, data)
         }
     
     def get_video_data(self, name: str) -> dict:
         """Get raw video bytes and metadata"""
         if name not in self.files:
             raise FileNotFoundError(f"File {name} not in archive")
-        ext = self.files[name]['type'].lower()
+        data = self.get_file(name)
         return {
-            'data': self.get_file(name),
-            'metadata': self._get_video_info(self.files[name]['content'], ext)
+            'data': data,
+            'metadata': self._parsed_info(name, self._get_video_info, data)
         }
+    
+    def _parsed_info(self, name: str, parse, data: Optional[bytes] = None) -> dict:
+        """
+        Media info from parse(data, ext), parsed once per entry
+        Adding a file replaces its entry, which drops the cached info.
+        """
+        entry = self.files[name]
+        if entry.info is None:
+            if data is None:
+                data = self.get_file(name)
+            entry.info = parse(data, entry.type.lower())
+        return dict(entry.info)
+    
     def get_file_as_text(self, name: str, encoding: str = 'utf-8') -> Optional[str]:
         """Get file content as text"""
         content = self.get_file(name)
@@ -1226,16 +2196,27 @@ class CrudeArchiveHandler:
     
     def add_text_file(self, name: str, text: str, encoding: str = 'utf-8') -> None:
         """Add a text file to the archive"""
-        file_type = name.split('.')[-1] if '.' in name else 'txt'
-        self.add_file(name, text.encode(encoding), file_type)
+        file_type = _infer_type(name, 'txt')
+        self._store(name, text.encode(encoding), file_type)
     
     def import_directory(self, dir_path: str) -> None:
         """Import all files from a directory"""
-        for root, _, files in os.walk(dir_path):
-            for file in files:
-                file_path = os.path.join(root, file)
-                with open(file_path, 'rb') as f:
-                    self.add_file(file, f.read())
+        items = []
+        # The pool is shut down before the walk closes its directory fds
+        with closing(_walk_files(dir_path)) as walk, \
+                ThreadPoolExecutor(max_workers=_IMPORT_WORKERS) as pool:
+            for dir_fd, names in walk:
+                if len(names) > _PARALLEL_IMPORT_MIN:
+                    contents = pool.map(_read_file, names, itertools.repeat(dir_fd))
+                else:
+                    contents = (_read_file(name, dir_fd) for name in names)
+                
+                for name, content in zip(names, contents):
+                    name = os.path.basename(name)
+                    items.append((name, content, _infer_type(name)))
+        
+        # Archive inserts stay on the calling thread
+        self.bulk_add(items)
 
     def get_font(self, identifier: str) -> Optional[bytes]:
         """
@@ -1247,10 +2228,17 @@ class CrudeArchiveHandler:
             return self.get_file(identifier)
         
         # Try path-based lookup (case insensitive)
+        if self._lower_names is None:
+            self._lower_names = {}
+            for name in self.files:
+                self._lower_names.setdefault(name.lower(), name)
         identifier_lower = identifier.lower()
-        for name in self.files:
-            if name.lower() == identifier_lower or name.lower().endswith(identifier_lower):
-                return self.get_file(name)
+        name = self._lower_names.get(identifier_lower)
+        if name is None:
+            name = next((name for lower, name in self._lower_names.items()
+                         if lower.endswith(identifier_lower)), None)
+        if name is not None and name in self.files:
+            return self.get_file(name)
         
         return None
     
@@ -1267,11 +2255,11 @@ class CrudeArchiveHandler:
         """
         fonts = {}
         for name, info in self.files.items():
-            if info['type'].lower() in {'ttf', 'otf', 'woff', 'woff2'}:
+            if info.type.lower() in {'ttf', 'otf', 'woff', 'woff2'}:
                 fonts[name] = {
                     'data': self.get_file(name),  # Using get_file() instead of direct access
-                    'type': info['type'],
-                    'metadata': info.get('metadata', {})
+                    'type': info.type,
+                    'metadata': info.metadata or {}
                 }
         return fonts
     
@@ -1281,7 +2269,7 @@ class CrudeArchiveHandler:
         if not font_data:
             raise FileNotFoundError(f"Font {identifier} not found in archive")
         
-        ext = identifier.split('.')[-1].lower()
+        ext = _infer_type(identifier).lower()
         return self._extract_font_metadata(font_data, ext)
     
     # ======================
@@ -1305,21 +2293,20 @@ class CrudeArchiveHandler:
         try:
             if ext in ('ttf', 'otf'):
                 # Parse SFNT tables (common to TTF/OTF)
-                num_tables = struct.unpack('>H', data[4:6])[0]
+                num_tables = _U16BE.unpack_from(data, 4)[0]
                 metadata['tables'] = num_tables
                 
-                # Look for name table (contains font names)
-                for i in range(num_tables):
-                    offset = 12 + i*16
-                    tag = data[offset:offset+4].decode('ascii', errors='ignore')
-                    if tag == 'name':
-                        name_offset = struct.unpack('>I', data[offset+8:offset+12])[0]
+                # Look for name table (contains font names), decoding the
+                # whole table directory in one pass
+                count = min(num_tables, (len(data) - _SFNT_DIR_START) // _SFNT_TABLE.size)
+                directory = memoryview(data)[_SFNT_DIR_START:
+                                             _SFNT_DIR_START + count * _SFNT_TABLE.size]
+                for tag, _, name_offset, _ in _SFNT_TABLE.iter_unpack(directory):
+                    if tag == b'name':
+                        # Basic name extraction (simplified)
+                        name_count = _U16BE.unpack_from(data, name_offset + 2)[0]
+                        metadata['names'] = name_count
                         break
-                
-                # Basic name extraction (simplified)
-                if 'name_offset' in locals():
-                    name_count = struct.unpack('>H', data[name_offset+2:name_offset+4])[0]
-                    metadata['names'] = name_count
             
             elif ext == 'woff':
                 metadata['flavor'] = data[8:12].decode('ascii', errors='ignore')
@@ -1,43 +1,132 @@
 import base64
+import functools
 import json
 import os
 import struct
 import zlib
-from typing import Dict, Any, Optional, Union, List, Set
+from typing import Dict, Any, Optional, Union, List, Set, Iterator, Tuple
+
+try:
+    import zstandard as zstd
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+try:
+    import pybase64
+    PYBASE64_AVAILABLE = True
+except ImportError:
+    PYBASE64_AVAILABLE = False
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+def _json_dumps(obj: Any) -> bytes:
+    """Encode the archive metadata section as UTF-8 JSON"""
+    if ORJSON_AVAILABLE:
+        # Keys are coerced to str like the stdlib encoder does
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj).encode('utf-8')
+
+def _json_loads(data: Union[bytes, memoryview]) -> Any:
+    """Decode a UTF-8 JSON section straight from bytes or any buffer"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(str(data, 'utf-8'))
+
+# Binary table of contents records (all little-endian)
+_TOC_HEADER = struct.Struct('<IQ')    # file count, metadata length
+_TOC_NAME_LEN = struct.Struct('<H')
+_TOC_TYPE_LEN = struct.Struct('<B')
+_TOC_ENTRY = struct.Struct('<BQQ')    # flags, payload offset, payload length
+
+# File signature checks of validate_file, types without one always pass
+_MAGIC_SIGNATURES = {
+    'png': lambda d: d.startswith(b'\x89PNG'),
+    'jpg': lambda d: d.startswith(b'\xFF\xD8'),
+    'gif': lambda d: d.startswith(b'GIF'),
+    'zip': lambda d: d.startswith(b'PK\x03\x04'),
+    'pdf': lambda d: d.startswith(b'%PDF'),
+    'mp3': lambda d: d.startswith(b'ID3') or d[1:4] == b'MP3',
+    'obj': lambda d: b'v ' in d[:100],  # OBJ has vertices early
+    'fbx': lambda d: b'Kaydara' in d[:100],
+}
+
+class FileEntry:
+    """
+    A file stored in an archive: its payload, type, TOC flags and metadata
+    info caches media info parsed from the content and json_doc the parsed
+    JSON document, json_dirty set while it has changes not yet written to
+    content. Both are held in memory only, they are not saved.
+    """
+    __slots__ = ('content', 'type', 'flags', 'metadata', 'info', 'json_doc', 'json_dirty')
+    
+    def __init__(self, content: Any, file_type: str, flags: int = 0,
+                 metadata: Optional[Dict[str, Any]] = None):
+        self.content = content
+        self.type = file_type
+        self.flags = flags
+        self.metadata = metadata
+        self.info: Optional[Dict[str, Any]] = None
+        self.json_doc: Any = None
+        self.json_dirty = False
 
 class ArchiveCommon:
     """Shared functionality and constants for CRUD Archive"""
     
-    # Version 2 header for expanded format support
-    MAGIC_HEADER = b"CRUDEARCHv2"
+    # Version 3 header: binary table of contents followed by raw payloads
+    MAGIC_HEADER = b"CRUDEARCHv3"
+    
+    # Version 2 archives (JSON with base64 payloads) can still be loaded
+    LEGACY_MAGIC_HEADER = b"CRUDEARCHv2"
+    
+    # Chunk size used when streaming archive payloads to and from disk
+    IO_CHUNK_SIZE = 8 * 1024 * 1024
+    
+    # Block size for reading source files into the archive
+    READ_CHUNK_SIZE = 1024 * 1024
     
-    # Organized type categories
+    # Per-entry flags stored in the table of contents
+    FLAG_ZSTD = 0x01
+    
+    # Optional payload compression (requires zstandard)
+    COMPRESSIBLE_TYPES = {'txt', 'json', 'xml', 'csv', 'html', 'log', 'py', 'npy', 'npz'}
+    COMPRESSION_MIN_SIZE = 512      # Smaller payloads are stored as-is
+    COMPRESSION_MAX_RATIO = 0.95    # Keep compressed data only if it saves 5%
+    ZSTD_LEVEL = 3
+    
+    # Organized type categories, immutable so validation can't be altered
     MEDIA_TYPES = {
-        'images': {'png', 'jpg', 'jpeg', 'gif', 'bmp', 'tga'},
-        'audio': {'mp3', 'wav', 'ogg'},
-        'video': {'mp4', 'mpg', 'avi', 'mov'}
+        'images': frozenset({'png', 'jpg', 'jpeg', 'gif', 'bmp', 'tga'}),
+        'audio': frozenset({'mp3', 'wav', 'ogg'}),
+        'video': frozenset({'mp4', 'mpg', 'avi', 'mov'})
     }
     
     MODEL_FORMATS = {
-        'static': {'obj', 'stl', 'ply'},
-        'animated': {'fbx', 'gltf', 'glb', 'dae'},
-        'industry': {'3ds', 'blend'}
+        'static': frozenset({'obj', 'stl', 'ply'}),
+        'animated': frozenset({'fbx', 'gltf', 'glb', 'dae'}),
+        'industry': frozenset({'3ds', 'blend'})
     }
     
-    NUMERIC_TYPES = {'npy', 'npz', 'hdf5'}
-    FONT_TYPES = {'ttf', 'otf', 'woff', 'woff2'}
-    SCRIPT_TYPES = {'py', 'json', 'xml', 'yaml'}
+    NUMERIC_TYPES = frozenset({'npy', 'npz', 'hdf5'})
+    FONT_TYPES = frozenset({'ttf', 'otf', 'woff', 'woff2'})
+    SCRIPT_TYPES = frozenset({'py', 'json', 'xml', 'yaml'})
     
     # Combined supported types
-    SUPPORTED_TYPES = (
-        MEDIA_TYPES['images'] | MEDIA_TYPES['audio'] | MEDIA_TYPES['video'] |
-        set().union(*MODEL_FORMATS.values()) |
-        NUMERIC_TYPES | FONT_TYPES | SCRIPT_TYPES |
+    SUPPORTED_TYPES = frozenset().union(
+        *MEDIA_TYPES.values(), *MODEL_FORMATS.values(),
+        NUMERIC_TYPES, FONT_TYPES, SCRIPT_TYPES,
         {'txt', 'bin', 'md'}
     )
     
     # Security restrictions
-    RESTRICTED_TYPES = {'exe', 'dll', 'bat', 'sh', 'php', 'js', 'vbs'}
+    RESTRICTED_TYPES = frozenset({'exe', 'dll', 'bat', 'sh', 'php', 'js', 'vbs'})
+    
+    # Supported and not restricted, lowercased once so checks are one lookup
+    _ALLOWED_TYPES = frozenset(ft.lower() for ft in SUPPORTED_TYPES) - RESTRICTED_TYPES
     
     # Size limits (bytes)
     SIZE_LIMITS = {
@@ -45,6 +134,7 @@ class ArchiveCommon:
         'mp4': 500 * 1024 * 1024,      # 500MB for videos
         'glb': 200 * 1024 * 1024       # 200MB for binary models
     }
+    _DEFAULT_SIZE_LIMIT = SIZE_LIMITS['default']
 
     # Enhanced MIME type mapping
     MIME_TYPE_MAP = {
@@ -94,48 +184,168 @@ class ArchiveCommon:
     @staticmethod
     def encode_content(content: bytes) -> str:
         """Encode binary content for JSON storage"""
-        return base64.b64encode(content).decode('utf-8')
+        if PYBASE64_AVAILABLE:
+            # SIMD codec, returns the str without an extra decode pass
+            return pybase64.b64encode_as_string(content)
+        return base64.b64encode(content).decode('ascii')
     
     @staticmethod
     def decode_content(encoded: str) -> bytes:
         """Decode content from JSON storage"""
-        return base64.b64decode(encoded.encode('utf-8'))
+        if PYBASE64_AVAILABLE:
+            return pybase64.b64decode(encoded, validate=False)
+        return base64.b64decode(encoded)
     
     @staticmethod
-    def serialize_archive(files: Dict[str, Dict[str, Any]]) -> bytes:
+    def compress_content(content: bytes, file_type: str) -> Tuple[bytes, int]:
+        """
+        Compress a payload with zstd when it is worth it
+        Returns the payload to store and its TOC flags
+        """
+        if not ZSTD_AVAILABLE:
+            raise ImportError("zstandard is required for zstd compression")
+        if (len(content) < ArchiveCommon.COMPRESSION_MIN_SIZE or
+                file_type.lower() not in ArchiveCommon.COMPRESSIBLE_TYPES):
+            return content, 0
+        compressed = zstd.ZstdCompressor(level=ArchiveCommon.ZSTD_LEVEL).compress(content)
+        if len(compressed) > len(content) * ArchiveCommon.COMPRESSION_MAX_RATIO:
+            return content, 0
+        return compressed, ArchiveCommon.FLAG_ZSTD
+    
+    @staticmethod
+    def decompress_content(payload: bytes, flags: int) -> bytes:
+        """Undo compress_content for a payload stored with the given flags"""
+        if not flags & ArchiveCommon.FLAG_ZSTD:
+            return payload
+        if not ZSTD_AVAILABLE:
+            raise ImportError("zstandard is required to read zstd compressed files")
+        return zstd.ZstdDecompressor().decompress(payload)
+    
+    @staticmethod
+    def serialize_archive(files: Dict[str, FileEntry]) -> bytes:
         """Serialize archive data to bytes"""
-        data = {
-            'files': {
-                name: {
-                    'type': info['type'],
-                    'content': ArchiveCommon.encode_content(info['content'])
-                }
-                for name, info in files.items()
-            }
-        }
-        return json.dumps(data, indent=2).encode('utf-8')
+        return b''.join(ArchiveCommon.serialize_archive_iter(files))
     
     @staticmethod
-    def deserialize_archive(data: bytes) -> Dict[str, Dict[str, Any]]:
-        """Deserialize archive data from bytes"""
-        return json.loads(data.decode('utf-8'))
+    def serialize_archive_iter(files: Dict[str, FileEntry],
+                               extra: Optional[Dict[str, Any]] = None) -> Iterator[bytes]:
+        """
+        Serialize archive data as a stream of byte chunks
+        Layout after MAGIC_HEADER: TOC header, one TOC record per file,
+        JSON metadata, then every payload stored verbatim. Payload offsets
+        are relative to the start of the payload section. Per-file metadata
+        is kept in the JSON section under 'entries'.
+        """
+        yield from ArchiveCommon.serialize_toc_iter(files, extra)
+        for info in files.values():
+            yield from ArchiveCommon.payload_chunks(info.content)
+    
+    @staticmethod
+    def serialize_toc_iter(files: Dict[str, FileEntry],
+                           extra: Optional[Dict[str, Any]] = None) -> Iterator[bytes]:
+        """Serialize everything before the payload section, see serialize_archive_iter"""
+        archive_meta = dict(extra or {})
+        entries = {name: info.metadata for name, info in files.items()
+                   if info.metadata}
+        if entries:
+            archive_meta['entries'] = entries
+        metadata = _json_dumps(archive_meta)
+        
+        records = []
+        offset = 0
+        for name, info in files.items():
+            name_bytes = name.encode('utf-8')
+            type_bytes = info.type.encode('utf-8')
+            if len(name_bytes) > 0xFFFF or len(type_bytes) > 0xFF:
+                raise ValueError(f"File name or type too long: {name}")
+            length = len(info.content)
+            records.append(b''.join((
+                _TOC_NAME_LEN.pack(len(name_bytes)), name_bytes,
+                _TOC_TYPE_LEN.pack(len(type_bytes)), type_bytes,
+                _TOC_ENTRY.pack(info.flags, offset, length)
+            )))
+            offset += length
+        
+        yield _TOC_HEADER.pack(len(records), len(metadata))
+        yield b''.join(records)
+        yield metadata
+    
+    @staticmethod
+    def payload_chunks(content: Any) -> Iterator[bytes]:
+        """Yield the stored bytes of one payload as written to the archive"""
+        if hasattr(content, 'view'):
+            # Mapped from an archive on disk, written without a copy
+            with content.view() as view:
+                yield view
+        elif hasattr(content, 'chunks'):
+            # Still in its source file, streamed through in blocks
+            yield from content.chunks()
+        elif hasattr(content, 'resolve'):
+            yield content.resolve()
+        else:
+            yield content
+    
+    @staticmethod
+    def deserialize_archive(data: Union[bytes, memoryview]) -> Dict[str, Any]:
+        """
+        Parse the table of contents of an archive body (bytes or any buffer)
+        Returns the metadata with a 'files' mapping of name to type, flags,
+        offset, length and, when present, metadata. Offsets are relative to
+        the start of data.
+        """
+        try:
+            count, meta_len = _TOC_HEADER.unpack_from(data, 0)
+            pos = _TOC_HEADER.size
+            files = {}
+            for _ in range(count):
+                name_len, = _TOC_NAME_LEN.unpack_from(data, pos)
+                pos += _TOC_NAME_LEN.size
+                name = str(data[pos:pos + name_len], 'utf-8')
+                pos += name_len
+                type_len, = _TOC_TYPE_LEN.unpack_from(data, pos)
+                pos += _TOC_TYPE_LEN.size
+                file_type = str(data[pos:pos + type_len], 'utf-8')
+                pos += type_len
+                flags, offset, length = _TOC_ENTRY.unpack_from(data, pos)
+                pos += _TOC_ENTRY.size
+                files[name] = {'type': file_type, 'flags': flags,
+                               'offset': offset, 'length': length}
+            archive = _json_loads(data[pos:pos + meta_len])
+            pos += meta_len
+        except (struct.error, UnicodeDecodeError, json.JSONDecodeError) as e:
+            # orjson.JSONDecodeError subclasses json.JSONDecodeError
+            raise ValueError(f"Corrupt archive table of contents: {e}")
+        
+        for info in files.values():
+            info['offset'] += pos
+            if info['offset'] + info['length'] > len(data):
+                raise ValueError("Archive is truncated")
+        for name, metadata in archive.pop('entries', {}).items():
+            if name in files:
+                files[name]['metadata'] = metadata
+        archive['files'] = files
+        return archive
+    
+    @staticmethod
+    def deserialize_legacy_archive(data: Union[bytes, memoryview]) -> Dict[str, Dict[str, Any]]:
+        """Deserialize a version 2 (JSON + base64) archive body"""
+        return _json_loads(data)
     
     @staticmethod
+    @functools.lru_cache(maxsize=128)
     def validate_file_type(file_type: str) -> bool:
         """
         Validate if a file type is supported and not restricted
         Returns True if file can be added to archive
+        Results are cached, imports only see a handful of distinct types.
         """
-        file_type = file_type.lower().strip('.')
-        return (file_type in ArchiveCommon.SUPPORTED_TYPES and 
-                file_type not in ArchiveCommon.RESTRICTED_TYPES)
+        return file_type.lower().strip('.') in ArchiveCommon._ALLOWED_TYPES
     
     @staticmethod
     def validate_file_size(data: bytes, file_type: str) -> bool:
         """Check if file size is within limits"""
         file_type = file_type.lower().strip('.')
-        max_size = ArchiveCommon.SIZE_LIMITS.get(file_type, 
-                 ArchiveCommon.SIZE_LIMITS['default'])
+        max_size = ArchiveCommon.SIZE_LIMITS.get(file_type, ArchiveCommon._DEFAULT_SIZE_LIMIT)
         return len(data) <= max_size
      
 
@@ -144,51 +354,24 @@ class ArchiveCommon:
         """Comprehensive file validation"""
         file_type = file_type.lower().strip('.')
         
-        # Type check
-        if file_type not in cls.SUPPORTED_TYPES:
-            return False
-            
-        # Security check
-        if file_type in cls.RESTRICTED_TYPES:
+        # Type and security check, cheapest first
+        if file_type not in cls._ALLOWED_TYPES:
             return False
             
         # Size check
-        max_size = cls.SIZE_LIMITS.get(file_type, cls.SIZE_LIMITS['default'])
-        if len(data) > max_size:
+        if len(data) > cls.SIZE_LIMITS.get(file_type, cls._DEFAULT_SIZE_LIMIT):
             return False
             
         # Magic number validation
-        if not cls._check_magic_numbers(data, file_type):
-            return False
-            
-        return True
+        return cls._check_magic_numbers(data, file_type)
 
     @staticmethod
     def _check_magic_numbers(data: bytes, file_type: str) -> bool:
         """Verify file signatures"""
-        signatures = {
-            'png': b'\x89PNG',
-            'jpg': b'\xFF\xD8',
-            'gif': b'GIF',
-            'zip': b'PK\x03\x04',
-            'pdf': b'%PDF',
-            'mp3': (b'ID3', lambda d: d[1:4] == b'MP3'),
-            'obj': (lambda d: b'v ' in d[:100]),  # OBJ has vertices early
-            'fbx': (lambda d: b'Kaydara' in d[:100])
-        }
-        
-        check = signatures.get(file_type.lower())
-        if not check:
+        check = _MAGIC_SIGNATURES.get(file_type.lower())
+        if check is None:
             return True  # No signature check available
-            
-        if isinstance(check, bytes):
-            return data.startswith(check)
-        elif callable(check):
-            return check(data)
-        elif isinstance(check, tuple):
-            return any(data.startswith(s) if isinstance(s, bytes) else s(data) 
-                   for s in check)
-        return True
+        return check(data)
 
     @staticmethod
     def get_file_category(file_type: str) -> str:
@@ -1,23 +1,47 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
+import codecs
+import io
 import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
 try:
-    from crudearch.archive_handler import CrudeArchiveHandler
+    from PIL import Image, ImageTk
+    PIL_AVAILABLE = True
 except ImportError:
-    try:
-        from archive_handler import CrudeArchiveHandler
-    except ImportError:
-        try:
-            from .archive_handler import CrudeArchiveHandler
-        except ImportError as e:
-            raise ImportError(
-                "Failed to import CrudeArchiveHandler. "
-                "Tried:\n"
-                "1. crudearch.archive_handler\n"
-                "2. archive_handler\n"
-                "3. .archive_handler\n"
-                f"Original error: {str(e)}\n"
-            )
+    PIL_AVAILABLE = False
+
+# Imported as part of the crudearch package, or run as a flat script
+if __package__:
+    from .archive_handler import CrudeArchiveHandler
+    from .common import ArchiveCommon
+else:
+    from archive_handler import CrudeArchiveHandler
+    from common import ArchiveCommon
+
+# Rows added to the file list at a time, more are added as it scrolls near the end
+LIST_BATCH_SIZE = 200
+
+# Bytes of a text file shown in the preview
+PREVIEW_LIMIT = 64 * 1024
+# Characters inserted into the preview per idle callback
+PREVIEW_CHUNK = 16 * 1024
+
+# Block size for copying an exported file out of the archive
+EXPORT_CHUNK_SIZE = 1024 * 1024
+
+# Quiet time after a selection change before its preview is rendered
+SELECT_DELAY_MS = 120
+
+# How often the Tk thread checks on background archive work
+IO_POLL_MS = 50
+
+# File type groups of the preview, built once
+_TEXT_TYPES = frozenset({'txt', 'json', 'xml', 'py', 'md'})
+_IMAGE_TYPES = frozenset({'png', 'jpg', 'jpeg', 'gif', 'bmp'})
+_MODEL_TYPES = ArchiveCommon.MODEL_FORMATS['static'] | ArchiveCommon.MODEL_FORMATS['animated']
+_NUMERIC_TYPES = frozenset({'npy', 'npz', 'hdf5'})
 
 class CrudeArchiveManager:
     """GUI application for managing CRUDE archives"""
@@ -29,6 +53,14 @@ class CrudeArchiveManager:
         self.archive_handler = None
         self.archive_ext = {"ext_name":"CRUDE Archive", "ext":"crudearch"}
         self.current_file = None
+        self._entries = []      # (name, type) of every file, in list order
+        self._rows_loaded = 0
+        self._row_iids = set()  # Rows created in file_list, shown or detached
+        self._pending_select = None  # after() id of the scheduled preview
+        self._preview_job = None     # after_idle() id of the next preview chunk
+        # One worker, so archive operations never run concurrently
+        self._io_executor = ThreadPoolExecutor(max_workers=1)
+        self._busy_tasks = 0
         
         self.setup_ui()
         
@@ -65,21 +97,30 @@ class CrudeArchiveManager:
         self.file_list.heading('type', text='Type')
         self.file_list.column('#0', width=300)
         self.file_list.column('type', width=100)
+        
+        list_scroll = ttk.Scrollbar(file_list_frame, orient=tk.VERTICAL,
+                                    command=self.file_list.yview)
+        list_scroll.pack(fill=tk.Y, side=tk.RIGHT)
+        self._list_scroll = list_scroll
+        self.file_list.configure(yscrollcommand=self._on_list_scroll)
         self.file_list.pack(fill=tk.BOTH, expand=True)
         
-        self.file_list.bind('<<TreeviewSelect>>', self.on_file_select)
+        self.file_list.bind('<<TreeviewSelect>>', self._schedule_select)
         
         self.add_export_menu()
         # File preview
         preview_frame = ttk.Labelframe(main_frame, text="File Preview")
         preview_frame.pack(fill=tk.BOTH, expand=True, side=tk.RIGHT)
         
-        self.preview_text = tk.Text(preview_frame, wrap=tk.WORD)
+        # Read-only, text is only ever written through set_preview()
+        self.preview_text = tk.Text(preview_frame, wrap=tk.WORD, state=tk.DISABLED)
         self.preview_text.pack(fill=tk.BOTH, expand=True)
         
         # Status bar
         self.status_bar = ttk.Label(self.root, text="Ready", relief=tk.SUNKEN)
         self.status_bar.pack(fill=tk.X, side=tk.BOTTOM)
+        # Shown in the status bar while background work runs
+        self.progress = ttk.Progressbar(self.status_bar, mode='indeterminate', length=120)
     
     def add_export_menu(self):
         """Add export option to right-click menu"""
@@ -102,7 +143,6 @@ class CrudeArchiveManager:
             return
     
         filename = self.file_list.item(selection[0])['text']
-        file_info = self.archive_handler.get_file_info(filename)
         
         save_path = filedialog.asksaveasfilename(
             initialfile=filename,
@@ -110,17 +150,55 @@ class CrudeArchiveManager:
         )
         
         if save_path:
-            try:
-                with open(save_path, 'wb') as f:
-                    f.write(file_info['content'])
-                self.update_status(f"Exported: {filename} → {save_path}")
-            except Exception as e:
-                messagebox.showerror("Export Error", f"Failed to export file: {str(e)}")
+            handler = self.archive_handler
+            
+            def export():
+                # Streamed, so large files are never held in memory whole
+                with handler.open_stream(filename) as src, \
+                        open(save_path, 'wb', buffering=EXPORT_CHUNK_SIZE) as dst:
+                    shutil.copyfileobj(src, dst, EXPORT_CHUNK_SIZE)
+            
+            self.update_status(f"Exporting: {filename}...")
+            self._run_in_background(
+                export, lambda _: self.update_status(f"Exported: {filename} → {save_path}"),
+                "Export Error", "Failed to export file")
 
     def update_status(self, message: str) -> None:
         """Update the status bar"""
         self.status_bar.config(text=message)
         self.root.update_idletasks()
+    
+    def _run_in_background(self, work, on_done, error_title: str, error_message: str) -> None:
+        """Run blocking archive work off the Tk thread, then on_done(result) back on it"""
+        self._set_busy(1)
+        future = self._io_executor.submit(work)
+        self.root.after(IO_POLL_MS, self._check_background, future, on_done,
+                        error_title, error_message)
+    
+    def _check_background(self, future, on_done, error_title: str, error_message: str) -> None:
+        """Poll background work from the Tk thread, the only one allowed to touch widgets"""
+        if not future.done():
+            self.root.after(IO_POLL_MS, self._check_background, future, on_done,
+                            error_title, error_message)
+            return
+        self._set_busy(-1)
+        try:
+            result = future.result()
+        except Exception as e:
+            messagebox.showerror(error_title, f"{error_message}: {str(e)}")
+        else:
+            on_done(result)
+    
+    def _set_busy(self, delta: int) -> None:
+        """Count running background tasks, showing the progress bar while there are any"""
+        was_busy = self._busy_tasks > 0
+        self._busy_tasks += delta
+        if self._busy_tasks and not was_busy:
+            self.progress.pack(side=tk.RIGHT, padx=2)
+            self.progress.start()
+        elif was_busy and not self._busy_tasks:
+            self.progress.stop()
+            self.progress.pack_forget()
         
     def new_archive(self) -> None:
         """Create a new archive"""
@@ -156,11 +234,19 @@ class CrudeArchiveManager:
     def save_archive(self) -> None:
         """Save the current archive"""
         if self.archive_handler and self.current_file:
-            try:
-                self.archive_handler.save()
-                self.update_status(f"Archive saved: {self.current_file}")
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to save archive: {str(e)}")
+            handler = self.archive_handler
+            saved_as = self.current_file
+            
+            def save():
+                # Set on the worker, after any earlier save to the old name is done
+                handler.filename = saved_as
+                handler.save()
+            
+            self.update_status(f"Saving: {saved_as}...")
+            self._run_in_background(
+                save,
+                lambda _: self.update_status(f"Archive saved: {saved_as}"),
+                "Error", "Failed to save archive")
         else:
             messagebox.showwarning("Warning", "No archive is currently open")
             
@@ -173,64 +259,152 @@ class CrudeArchiveManager:
             )
             
             if filename:
-                self.archive_handler.filename = filename
                 self.current_file = filename
                 self.save_archive()
         else:
             messagebox.showwarning("Warning", "No archive is currently open")
             
     def update_file_list(self) -> None:
-        """Update the file list display"""
-        self.file_list.delete(*self.file_list.get_children())
-        
-        if self.archive_handler:
-            for filename in self.archive_handler.list_files():
-                file_info = self.archive_handler.get_file_info(filename)
-                self.file_list.insert('', 'end', text=filename, values=(file_info['type']))
+        """Update the file list display, reusing the rows of files still present"""
+        self._entries = list(self.archive_handler.iter_file_meta()) if self.archive_handler else []
+        names = {name for name, _ in self._entries}
+        stale = [iid for iid in self._row_iids if iid not in names]
+        self.file_list.delete(*stale)
+        self._row_iids.difference_update(stale)
+        # Kept rows are reattached in order as their batch loads
+        self.file_list.detach(*self.file_list.get_children())
+        self._rows_loaded = 0
+        self._load_more_rows()
+    
+    def _load_more_rows(self) -> None:
+        """Add the next batch of rows, so large archives don't insert every row up front"""
+        end = min(self._rows_loaded + LIST_BATCH_SIZE, len(self._entries))
+        for index in range(self._rows_loaded, end):
+            filename, file_type = self._entries[index]
+            if filename in self._row_iids:
+                self.file_list.item(filename, values=(file_type,))
+                self.file_list.reattach(filename, '', 'end')
+            else:
+                self.file_list.insert('', 'end', iid=filename, text=filename, values=(file_type,))
+                self._row_iids.add(filename)
+        self._rows_loaded = end
+    
+    def _list_added(self, name: str, file_type: str) -> None:
+        """Show a file just added to the archive without rebuilding the list"""
+        for index, (entry, _) in enumerate(self._entries):
+            if entry == name:  # Replaced an existing file
+                self._entries[index] = (name, file_type)
+                if index < self._rows_loaded:
+                    self.file_list.item(name, values=(file_type,))
+                return
+        self._entries.append((name, file_type))
+        if self._rows_loaded == len(self._entries) - 1:
+            self._load_more_rows()  # Everything before it is shown, so show it too
+    
+    def _list_removed(self, name: str) -> None:
+        """Drop a file's row without rebuilding the list"""
+        index = next((i for i, (entry, _) in enumerate(self._entries) if entry == name), None)
+        if index is None:
+            return
+        del self._entries[index]
+        if name in self._row_iids:
+            self.file_list.delete(name)
+            self._row_iids.discard(name)
+        if index < self._rows_loaded:
+            self._rows_loaded -= 1
+    
+    def _on_list_scroll(self, first: str, last: str) -> None:
+        """Keep the scrollbar in sync and load more rows once the end comes into view"""
+        self._list_scroll.set(first, last)
+        if float(last) >= 0.9 and self._rows_loaded < len(self._entries):
+            self._load_more_rows()
                 
-    def on_file_select(self, event) -> None:
+    def _schedule_select(self, event) -> None:
+        """Debounce selection changes, so moving through the list only previews where it stops"""
+        if self._pending_select is not None:
+            self.root.after_cancel(self._pending_select)
+        self._pending_select = self.root.after(SELECT_DELAY_MS, self.on_file_select)
+    
+    def on_file_select(self, event=None) -> None:
         """Handle file selection for all supported types"""
+        self._pending_select = None
+        if self._busy_tasks:
+            # Background work may be saving the archive, preview once it's done
+            self._pending_select = self.root.after(SELECT_DELAY_MS, self.on_file_select)
+            return
         selection = self.file_list.selection()
         if not selection or not self.archive_handler:
             return
     
         filename = self.file_list.item(selection[0])['text']
-        file_info = self.archive_handler.get_file_info(filename)
-        
-        # Clear previous preview
-        self.preview_text.delete(1.0, tk.END)
+        # Only what is shown is read, not the whole file
+        try:
+            meta = self.archive_handler.get_meta(filename)
+        except Exception as e:
+            self.set_preview(f"File: {filename}\n\nCannot preview: {str(e)}")
+            return
         
         # Get basic file info
-        file_type = file_info['type'].lower()
-        size = len(file_info['content'])
-        self.preview_text.insert(tk.END, f"File: {filename}\nType: {file_type}\nSize: {size} bytes\n\n")
+        file_type = meta['type'].lower()
+        size = meta['size']
+        header = f"File: {filename}\nType: {file_type}\nSize: {size} bytes\n\n"
         
         # Handle different file categories
-        if file_type in {'txt', 'json', 'xml', 'py', 'md'}:
+        if size == 0:
+            body = "[empty]"  # Nothing to read or decode
+        
+        elif file_type in _TEXT_TYPES:
             try:
-                text_content = self.archive_handler.get_file_as_text(filename)
-                self.preview_text.insert(tk.END, text_content)
+                head = self.archive_handler.get_bytes(filename, 0, PREVIEW_LIMIT)
+                # Not final, so a character cut off at the limit is dropped
+                decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+                body = decoder.decode(head, final=size <= PREVIEW_LIMIT)
+                if size > PREVIEW_LIMIT:
+                    body += f"\n\n... truncated ({size - PREVIEW_LIMIT} bytes omitted)"
             except Exception as e:
-                self.preview_text.insert(tk.END, f"Cannot preview: {str(e)}")
+                body = f"Cannot preview: {str(e)}"
         
-        elif file_type in {'png', 'jpg', 'jpeg', 'gif', 'bmp'}:
-            self.preview_text.insert(tk.END, "[Binary Image Data - Use Extract to access]")
+        elif file_type in _IMAGE_TYPES:
+            body = "[Binary Image Data - Use Extract to access]"
         
-        elif file_type in ArchiveCommon.MODEL_FORMATS['static'] | ArchiveCommon.MODEL_FORMATS['animated']:
-            self.preview_text.insert(tk.END, f"[3D Model Data - {file_type.upper()} format]")
+        elif file_type in _MODEL_TYPES:
+            body = f"[3D Model Data - {file_type.upper()} format]"
         
-        elif file_type in {'npy', 'npz', 'hdf5'}:
-            self.preview_text.insert(tk.END, "[Numeric Data - Use Extract to access]")
+        elif file_type in _NUMERIC_TYPES:
+            body = "[Numeric Data - Use Extract to access]"
+        
+        else:
+            body = "[Binary Data - Use Extract to access]"
         
+        self.set_preview(header + body)
+    
+    def set_preview(self, text: str) -> None:
+        """Replace the preview text, the widget stays read-only so edits never reflow it"""
+        if self._preview_job is not None:
+            self.root.after_cancel(self._preview_job)  # Drop the rest of the last preview
+        self.preview_text.configure(state=tk.NORMAL)
+        self.preview_text.delete(1.0, tk.END)
+        self.preview_text.configure(state=tk.DISABLED)
+        self._insert_preview(text, 0)
+    
+    def _insert_preview(self, text: str, start: int) -> None:
+        """Insert text[start:] a chunk per idle callback, so events are handled in between"""
+        end = start + PREVIEW_CHUNK
+        self.preview_text.configure(state=tk.NORMAL)
+        self.preview_text.insert(tk.END, text[start:end])
+        self.preview_text.configure(state=tk.DISABLED)
+        if end < len(text):
+            self._preview_job = self.root.after_idle(self._insert_preview, text, end)
         else:
-            self.preview_text.insert(tk.END, "[Binary Data - Use Extract to access]")
+            self._preview_job = None
 
     def preview_image(self, image_data):
         """Preview image files while maintaining text widget availability"""
+        if not PIL_AVAILABLE:
+            self.set_preview("Install Pillow for image preview")
+            self.preview_text.pack(fill=tk.BOTH, expand=True)
+            return
         try:
-            from PIL import Image, ImageTk
-            import io
-            
             # Hide text widget temporarily
             self.preview_text.pack_forget()
             
@@ -244,13 +418,8 @@ class CrudeArchiveManager:
             img_label.image = photo  # Keep reference
             img_label.pack(fill=tk.BOTH, expand=True)
             
-        except ImportError:
-            self.preview_text.delete(1.0, tk.END)
-            self.preview_text.insert(tk.END, "Install Pillow for image preview")
-            self.preview_text.pack(fill=tk.BOTH, expand=True)
         except Exception as e:
-            self.preview_text.delete(1.0, tk.END)
-            self.preview_text.insert(tk.END, f"Error previewing image: {str(e)}")
+            self.set_preview(f"Error previewing image: {str(e)}")
             self.preview_text.pack(fill=tk.BOTH, expand=True)
     
     def display_file_metadata(self, file_info, filename):
@@ -272,9 +441,7 @@ class CrudeArchiveManager:
             f"Header Offset: {file_info.get('header_offset', 'N/A')}"
         ]
         
-        self.preview_text.delete(1.0, tk.END)
-        for item in metadata:
-            self.preview_text.insert(tk.END, item + "\n")
+        self.set_preview("\n".join(metadata) + "\n")
 
 
     def add_file_dialog(self) -> None:
@@ -288,18 +455,22 @@ class CrudeArchiveManager:
         )
         
         if filename:
-            try:
+            handler = self.archive_handler
+            name = os.path.basename(filename)
+            
+            def add():
+                # The handler infers the type from the name
                 with open(filename, 'rb') as f:
-                    content = f.read()
-                
-                name = os.path.basename(filename)
-                file_type = name.split('.')[-1] if '.' in name else 'bin'
-                
-                self.archive_handler.add_file(name, content, file_type)
-                self.update_file_list()
+                    handler.add_file_stream(name, f)
+                return handler.get_meta(name)['type']
+            
+            def added(file_type):
+                if handler is self.archive_handler:  # Still the archive shown
+                    self._list_added(name, file_type)
                 self.update_status(f"Added file: {name}")
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to add file: {str(e)}")
+            
+            self.update_status(f"Adding file: {name}...")
+            self._run_in_background(add, added, "Error", "Failed to add file")
                 
     def remove_file(self) -> None:
         """Remove the selected file from the archive"""
@@ -311,10 +482,17 @@ class CrudeArchiveManager:
         if selection:
             filename = self.file_list.item(selection[0])['text']
             if messagebox.askyesno("Confirm", f"Remove file '{filename}' from archive?"):
-                self.archive_handler.remove_file(filename)
-                self.update_file_list()
-                self.preview_text.delete(1.0, tk.END)
-                self.update_status(f"Removed file: {filename}")
+                handler = self.archive_handler
+                
+                def removed(_):
+                    if handler is self.archive_handler:
+                        self._list_removed(filename)
+                        self.set_preview("")
+                    self.update_status(f"Removed file: {filename}")
+                
+                # Queued behind any save still writing the archive
+                self._run_in_background(lambda: handler.remove_file(filename), removed,
+                                        "Error", "Failed to remove file")
         else:
             messagebox.showwarning("Warning", "No file selected")
 
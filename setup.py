@@ -1,13 +1,25 @@
-from setuptools import setup, find_packages
-# original line >>>>       'crudearch-manager=crudearch.manager:run_gui'
+from setuptools import setup
+from setuptools.command.build_py import build_py
+
+
+class BuildPy(build_py):
+    """Leave the test modules kept next to the sources out of the package"""
+    
+    def find_package_modules(self, package, package_dir):
+        modules = super().find_package_modules(package, package_dir)
+        return [m for m in modules if not m[1].startswith('test_')]
+
+
+# The repository root is the crudearch package itself
 setup(
     name="crudearch",
     version="1.0",
-    packages=find_packages(),
+    package_dir={'crudearch': '.'},
+    packages=['crudearch'],
+    cmdclass={'build_py': BuildPy},
     entry_points={
         'console_scripts': [
-
-            'crudearch-manager=crudearch/manager:run_gui'
+            'crudearch-manager=crudearch.manager:run_gui'
         ]
     }
 )
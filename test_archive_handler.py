@@ -0,0 +1,402 @@
+import io
+import json
+import struct
+
+import pytest
+
+import archive_handler
+from archive_handler import CrudeArchiveHandler
+from common import ArchiveCommon
+
+def _roundtrip(archive):
+    archive.save()
+    reloaded = CrudeArchiveHandler(archive.filename)
+    reloaded.load()
+    return reloaded
+
+def test_save_load_roundtrip(tmp_path):
+    path = str(tmp_path / "roundtrip.crudearch")
+    archive = CrudeArchiveHandler(path)
+    archive.create(path)
+    archive.add_text_file("notes.txt", "Important project notes")
+    archive.add_file("blob.bin", bytes(range(256)))
+    
+    reloaded = _roundtrip(archive)
+    assert reloaded.list_files() == ["notes.txt", "blob.bin"]
+    assert list(reloaded.iter_file_meta()) == [("notes.txt", "txt"), ("blob.bin", "bin")]
+    assert reloaded.get_file_as_text("notes.txt") == "Important project notes"
+    assert reloaded.get_file("blob.bin") == bytes(range(256))
+
+def test_resave_without_reading_entries(tmp_path):
+    path = str(tmp_path / "resave.crudearch")
+    archive = CrudeArchiveHandler(path)
+    archive.create(path)
+    archive.add_file("blob.bin", bytes(range(256)) * 10)
+    archive.add_text_file("notes.txt", "kept")
+    
+    # Entries are saved again straight from the loaded archive
+    reloaded = _roundtrip(_roundtrip(archive))
+    assert reloaded.get_file("blob.bin") == bytes(range(256)) * 10
+    assert reloaded.get_file_as_text("notes.txt") == "kept"
+
+def test_resave_copies_mapped_payloads(tmp_path, monkeypatch):
+    if archive_handler._COPY_FILE_RANGE is None:
+        pytest.skip("os.copy_file_range is not available")
+    # Payloads from this size up are copied from the loaded archive by the kernel
+    monkeypatch.setattr(ArchiveCommon, "IO_CHUNK_SIZE", 1024)
+    copied = []
+    copy_range = archive_handler._copy_range
+    def copy_part(src, dst, offset, length):
+        copied.append(length)
+        return copy_range(src, dst, offset, length // fraction)
+    monkeypatch.setattr(archive_handler, "_copy_range", copy_part)
+    
+    path = str(tmp_path / "copied.crudearch")
+    archive = CrudeArchiveHandler(path)
+    archive.create(path)
+    blob = bytes(range(256)) * 40
+    archive.add_file("blob.bin", blob)
+    archive.add_text_file("notes.txt", "kept")
+    
+    fraction = 1
+    reloaded = _roundtrip(_roundtrip(archive))
+    assert copied == [len(blob)]
+    assert reloaded.get_file("blob.bin") == blob
+    assert reloaded.get_file_as_text("notes.txt") == "kept"
+    
+    # The rest of a short copy is written from the mapping
+    fraction = 3
+    reloaded = _roundtrip(reloaded)
+    assert copied == [len(blob)] * 2
+    assert reloaded.get_file("blob.bin") == blob
+    assert reloaded.get_file_as_text("notes.txt") == "kept"
+    reloaded.close()
+
+def test_load_rejects_foreign_file(tmp_path):
+    path = tmp_path / "foreign.crudearch"
+    path.write_bytes(b"PK")
+    archive = CrudeArchiveHandler(str(path))
+    try:
+        archive.load()
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("Invalid archive was accepted")
+
+def test_import_directory(tmp_path):
+    source = tmp_path / "assets"
+    (source / "nested").mkdir(parents=True)
+    (source / "readme.txt").write_bytes(b"top level")
+    (source / "nested" / "data.json").write_bytes(b'{"key": "value"}')
+    (source / "nested" / "empty.bin").write_bytes(b"")
+    for i in range(20):  # Enough files to take the thread pool path
+        (source / "nested" / f"part{i}.txt").write_bytes(b"part %d" % i)
+    
+    archive = CrudeArchiveHandler()
+    archive.import_directory(str(source))
+    assert sorted(archive.list_files()) == sorted(
+        ["data.json", "empty.bin", "readme.txt"] + [f"part{i}.txt" for i in range(20)])
+    assert archive.get_file("part7.txt") == b"part 7"
+    assert archive.get_file("readme.txt") == b"top level"
+    assert archive.get_file("data.json") == b'{"key": "value"}'
+    assert archive.get_file("empty.bin") == b""
+
+def test_load_legacy_archive(tmp_path):
+    path = tmp_path / "legacy.crudearch"
+    body = {'files': {'a.txt': {'type': 'txt',
+                                'content': ArchiveCommon.encode_content(b"old format")}}}
+    path.write_bytes(ArchiveCommon.LEGACY_MAGIC_HEADER + json.dumps(body).encode('utf-8'))
+    
+    archive = CrudeArchiveHandler(str(path))
+    archive.load()
+    assert archive.get_file("a.txt") == b"old format"
+    
+    # Saving upgrades the archive to the current format
+    reloaded = _roundtrip(archive)
+    assert path.read_bytes().startswith(ArchiveCommon.MAGIC_HEADER)
+    assert reloaded.get_file("a.txt") == b"old format"
+
+def test_zstd_compression_roundtrip(tmp_path):
+    pytest.importorskip("zstandard")
+    path = str(tmp_path / "compressed.crudearch")
+    archive = CrudeArchiveHandler(path)
+    archive.create(path)
+    text = "compressible line\n" * 100
+    archive.add_file("big.txt", text, compression='zstd')
+    archive.add_file("small.txt", "tiny", compression='zstd')
+    
+    assert archive.files["big.txt"].flags == ArchiveCommon.FLAG_ZSTD
+    assert not archive.files["small.txt"].flags
+    reloaded = _roundtrip(archive)
+    assert reloaded.get_file_as_text("big.txt") == text
+    assert reloaded.get_file_as_text("small.txt") == "tiny"
+
+def test_meta_and_partial_reads(tmp_path):
+    pytest.importorskip("zstandard")
+    path = str(tmp_path / "partial.crudearch")
+    archive = CrudeArchiveHandler(path)
+    archive.create(path)
+    text = "".join(f"row {i}\n" for i in range(2000))
+    archive.add_file("rows.txt", text, compression="zstd")
+    archive.add_file("blob.bin", bytes(range(256)))
+    
+    reloaded = _roundtrip(archive)
+    meta = reloaded.get_meta("rows.txt")
+    assert meta["size"] == len(text)
+    assert meta["compressed"] == (meta["stored_size"] < len(text))
+    assert reloaded.get_bytes("rows.txt", 6, 12) == text[6:18].encode()
+    assert reloaded.get_bytes("blob.bin", 250, 10) == bytes(range(250, 256))
+    assert reloaded.get_meta("missing.bin") is None
+    
+    for name in ("rows.txt", "blob.bin"):
+        with reloaded.open_stream(name) as stream:
+            assert stream.read() == reloaded.get_file(name)
+    reloaded.close()
+
+def test_add_file_stream(tmp_path):
+    source = tmp_path / "source.bin"
+    source.write_bytes(bytes(range(256)) * 64)
+    path = str(tmp_path / "stream.crudearch")
+    archive = CrudeArchiveHandler(path)
+    archive.create(path)
+    with open(source, "rb") as f:
+        archive.add_file_stream("file.bin", f, chunk_size=1000)
+    archive.add_file_stream("memory.txt", io.BytesIO(b"from memory"))
+    with pytest.raises(ValueError):
+        archive.add_file_stream("tool.exe", io.BytesIO(b"MZ"))
+    
+    reloaded = _roundtrip(archive)
+    assert reloaded.get_file("file.bin") == bytes(range(256)) * 64
+    assert reloaded.get_file_as_text("memory.txt") == "from memory"
+
+def test_bulk_add_rejects_unsupported_types(tmp_path):
+    archive = CrudeArchiveHandler(str(tmp_path / "bulk.crudearch"))
+    with pytest.raises(ValueError):
+        archive.bulk_add([("a.txt", b"a", "txt"), ("run.exe", b"MZ", "exe")])
+    assert archive.list_files() == []
+    
+    archive.bulk_add([("a.txt", b"a", "txt"), ("b.bin", b"b", "bin")])
+    assert archive.get_file("b.bin") == b"b"
+
+def test_get_file_view(tmp_path):
+    path = str(tmp_path / "view.crudearch")
+    archive = CrudeArchiveHandler(path)
+    archive.create(path)
+    archive.add_file("blob.bin", bytes(range(256)))
+    assert archive.get_file_view("blob.bin") == bytes(range(256))
+    
+    reloaded = _roundtrip(archive)
+    with reloaded.get_file_view("blob.bin") as view:
+        assert view.readonly
+        assert view[:4] == bytes(range(4))
+    assert reloaded.get_file_view("missing.bin") is None
+
+def test_context_manager_releases_mapping(tmp_path):
+    path = str(tmp_path / "closed.crudearch")
+    archive = CrudeArchiveHandler(path)
+    archive.create(path)
+    archive.add_file("a.txt", "a")
+    archive.save()
+    
+    with CrudeArchiveHandler(path) as reloaded:
+        reloaded.load()
+        assert reloaded.get_file("a.txt") == b"a"
+    assert reloaded.list_files() == []
+    assert reloaded._mm is None
+
+def test_entry_metadata_roundtrip(tmp_path):
+    path = str(tmp_path / "meta.crudearch")
+    archive = CrudeArchiveHandler(path)
+    archive.create(path)
+    png = (b'\x89PNG\r\n\x1a\n' + struct.pack('>I', 13) + b'IHDR' +
+           struct.pack('>II', 4, 3) + b'\x08\x02\x00\x00\x00')
+    archive.add_image("pixel.png", png)
+    
+    reloaded = _roundtrip(archive)
+    metadata = reloaded.get_file_info("pixel.png")['metadata']
+    assert (metadata['width'], metadata['height']) == (4, 3)
+    assert reloaded.get_file("pixel.png") == png
+
+def test_mp3_frame_header_metadata(tmp_path):
+    archive = CrudeArchiveHandler(str(tmp_path / "audio.crudearch"))
+    # ID3v2 tag with a 5 byte body, a false sync byte, then an MPEG 1 Layer III frame
+    mp3 = (b'ID3\x03\x00\x00\x00\x00\x00\x05' + b'\xff\x00\x12\x00\x00' +
+           b'\xff\xfb\x90\x64' + bytes(100))
+    archive.add_audio("clip.mp3", mp3)
+    
+    metadata = archive.files["clip.mp3"].metadata
+    assert metadata['mpeg_version'] == '1'
+    assert metadata['layer'] == 'III'
+    assert metadata['bitrate'] == 128000
+    assert metadata['sample_rate'] == 44100
+
+def test_wav_header_metadata(tmp_path):
+    archive = CrudeArchiveHandler(str(tmp_path / "audio.crudearch"))
+    # 44 byte PCM header, stereo 16 bit at 44100 Hz, half a second of samples
+    wav = (b'RIFF' + struct.pack('<I', 36 + 88200) + b'WAVE' +
+           b'fmt ' + struct.pack('<IHHIIHH', 16, 1, 2, 44100, 176400, 4, 16) +
+           b'data' + struct.pack('<I', 88200) + bytes(88200))
+    archive.add_audio("clip.wav", wav)
+    
+    metadata = archive.files["clip.wav"].metadata
+    assert metadata['audio_format'] == 1
+    assert metadata['channels'] == 2
+    assert metadata['sample_rate'] == 44100
+    assert metadata['bit_depth'] == 16
+    assert metadata['duration'] == 0.5
+    assert archive._calculate_audio_duration(wav, 'wav') == 0.5
+
+def test_model_animations_roundtrip(tmp_path):
+    path = str(tmp_path / "anim.crudearch")
+    archive = CrudeArchiveHandler(path)
+    archive.create(path)
+    archive.add_file("hero.obj", b"v 0 0 0\n")
+    archive.update_model_animation("hero.obj", {'name': 'walk'})
+    
+    reloaded = _roundtrip(archive)
+    assert reloaded.get_animations("hero.obj") == [{'name': 'walk'}]
+
+def _atom(atom_type, body):
+    return struct.pack('>I', 8 + len(body)) + atom_type + body
+
+def test_mp4_metadata_and_streams(tmp_path):
+    archive = CrudeArchiveHandler(str(tmp_path / "video.crudearch"))
+    mvhd = _atom(b'mvhd', bytes(12) + struct.pack('>II', 1000, 5000) + bytes(80))
+    tkhd = _atom(b'tkhd', bytes(76) + struct.pack('>II', 1920 << 16, 1080 << 16))
+    hdlr = _atom(b'hdlr', bytes(8) + b'vide' + bytes(12))
+    stsd = _atom(b'stsd', struct.pack('>III', 0, 1, 16) + b'avc1' + bytes(8))
+    stsz = _atom(b'stsz', struct.pack('>IIIIII', 0, 0, 3, 100, 200, 300))
+    stco = _atom(b'stco', struct.pack('>IIII', 0, 2, 48, 4096))
+    stbl = _atom(b'stbl', stsd + stsz + stco)
+    trak = _atom(b'trak', tkhd + _atom(b'mdia', hdlr + _atom(b'minf', stbl)))
+    mp4 = _atom(b'ftyp', b'isom' + bytes(4)) + _atom(b'moov', mvhd + trak)
+    archive.add_video("clip.mp4", mp4)
+    
+    info = archive.get_media_info("clip.mp4")
+    assert info['duration'] == 5.0
+    assert (info['width'], info['height']) == (1920, 1080)
+    stream, = info['streams']
+    assert (stream['type'], stream['codec'], stream['sample_count']) == ('vide', 'avc1', 3)
+    assert list(stream['sample_sizes']) == [100, 200, 300]
+    assert list(stream['chunk_offsets']) == [48, 4096]
+    
+    # Parsed once, until the file is replaced
+    assert archive.get_video_data("clip.mp4")['metadata']['duration'] == 5.0
+    archive.files["clip.mp4"].info['duration'] = 1.0
+    assert archive.get_media_info("clip.mp4")['duration'] == 1.0
+    archive.add_video("clip.mp4", mp4)
+    assert archive.get_media_info("clip.mp4")['duration'] == 5.0
+    
+    # Parsed from a view into the mapped file after loading
+    reloaded = _roundtrip(archive)
+    info = reloaded.get_media_info("clip.mp4")
+    assert (info['codec'], list(info['streams'][0]['sample_sizes'])) == ('isom', [100, 200, 300])
+    reloaded.close()
+
+def test_codec_config_records():
+    archive = CrudeArchiveHandler()
+    # The FourCC also turns up in sample data, behind a size that overruns the file
+    avcc = _atom(b'avcC', bytes([1, 100, 0, 40, 0xFF, 0xE0, 0]))
+    avc = _atom(b'mdat', b'\xff\xff\xff\xffavcC' + bytes(16)) + avcc
+    expected = {'profile': 100, 'level': 40, 'nalu_size': 4}
+    assert archive._get_h264_info(avc) == expected
+    assert archive._get_h264_info(memoryview(avc)) == expected
+    
+    # Main tier, Main profile, level 4.1; the first match's size is too small
+    hvcc = _atom(b'hvcC', bytes([1, 0x21]) + bytes(10) + bytes([123]) + bytes(10))
+    hevc = _atom(b'mdat', b'\x00\x00\x00\x01hvcC') + hvcc
+    assert archive._get_hevc_info(hevc) == {'profile': 1, 'tier': 1, 'level': 123}
+
+def test_mp4_codec_config(tmp_path):
+    archive = CrudeArchiveHandler(str(tmp_path / "codec.crudearch"))
+    # avc1 sample entry: 78 bytes of visual fields, then the avcC atom
+    avcc = _atom(b'avcC', bytes([1, 100, 0, 40, 0xFF, 0xE0, 0]))
+    entry = struct.pack('>I', 86 + len(avcc)) + b'avc1' + bytes(78) + avcc
+    stsd = _atom(b'stsd', struct.pack('>II', 0, 1) + entry)
+    hdlr = _atom(b'hdlr', bytes(8) + b'vide' + bytes(12))
+    trak = _atom(b'trak', _atom(b'mdia', hdlr + _atom(b'minf', _atom(b'stbl', stsd))))
+    # The FourCC also turns up in sample data, behind a size that overruns the file
+    mdat = _atom(b'mdat', b'\xff\xff\xff\xffavcC' + bytes(16))
+    mp4 = _atom(b'ftyp', b'isom' + bytes(4)) + mdat + _atom(b'moov', trak)
+    archive.add_video("clip.mp4", mp4)
+    
+    expected = {'profile': 100, 'level': 40, 'nalu_size': 4}
+    assert archive.get_media_info("clip.mp4")['codec_info'] == expected
+    reloaded = _roundtrip(archive)
+    assert reloaded.get_media_info("clip.mp4")['codec_info'] == expected
+    reloaded.close()
+
+def test_add_file_from_path(tmp_path):
+    source = tmp_path / "large.bin"
+    source.write_bytes(bytes(range(256)) * 64)
+    path = str(tmp_path / "streamed.crudearch")
+    archive = CrudeArchiveHandler(path)
+    archive.create(path)
+    archive.add_file_from_path("large.bin", str(source))
+    assert archive.get_file("large.bin") == source.read_bytes()
+    
+    reloaded = _roundtrip(archive)
+    assert reloaded.get_file("large.bin") == source.read_bytes()
+
+def test_text_edits_in_place(tmp_path):
+    path = str(tmp_path / "text.crudearch")
+    archive = CrudeArchiveHandler(path)
+    archive.create(path)
+    archive.add_text_data("notes.txt", "héllo")
+    before = archive.get_file("notes.txt")
+    archive.append_text("notes.txt", " world")
+    archive.prepend_text("notes.txt", ">> ")
+    archive.insert_text_at_index("notes.txt", "!", 8)
+    archive.replace_text("notes.txt", "world", "there")
+    assert archive.get_file_as_text("notes.txt") == ">> héllo! there"
+    assert before == "héllo".encode('utf-8')
+    
+    reloaded = _roundtrip(archive)
+    reloaded.truncate_text_row("notes.txt", 0, 3)
+    assert reloaded.get_file_as_text("notes.txt") == "héllo! there"
+    
+    reloaded.add_text_data("short.txt", "héllo")
+    reloaded.replace_text("short.txt", "", "-")
+    assert reloaded.get_file_as_text("short.txt") == "-h-é-l-l-o-"
+
+def test_update_json_value_deferred(tmp_path):
+    path = str(tmp_path / "json.crudearch")
+    archive = CrudeArchiveHandler(path)
+    archive.create(path)
+    archive.add_dict_as_json("config.json", {"a": 1})
+    archive.update_json_value("config.json", "b", 2)
+    assert json.loads(archive.get_file_as_text("config.json")) == {"a": 1, "b": 2}
+    
+    archive.update_json_value("config.json", "c", 3, defer_serialize=True)
+    assert "c" not in json.loads(archive.get_file_as_text("config.json"))
+    reloaded = _roundtrip(archive)
+    assert json.loads(reloaded.get_file_as_text("config.json")) == {"a": 1, "b": 2, "c": 3}
+    
+    # Text edits write out pending changes before they read the file
+    reloaded.update_json_value("config.json", "a", 99, defer_serialize=True)
+    reloaded.remove_text_column("config.json", 0, 0)
+    reloaded = _roundtrip(reloaded)
+    assert json.loads(reloaded.get_file_as_text("config.json"))["a"] == 99
+
+def test_numeric_data_roundtrip(tmp_path):
+    np = pytest.importorskip("numpy")
+    path = str(tmp_path / "numeric.crudearch")
+    archive = CrudeArchiveHandler(path)
+    archive.create(path)
+    array = np.arange(4096, dtype=np.float32).reshape(64, 64)
+    archive.add_numeric_data("grid.npz", array)
+    archive.add_numeric_data("grid.npy", array)
+    
+    archive.add_numeric_data("fortran.npy", np.asfortranarray(array))
+    records = np.array([(1, 2.5), (3, 4.5)], dtype=[('id', '<i4'), ('w', '<f8')])
+    archive.add_numeric_data("records.npy", records)
+    
+    reloaded = _roundtrip(archive)
+    assert (reloaded.get_numeric_data("grid.npz") == array).all()
+    loaded = reloaded.get_numeric_data("grid.npy")
+    assert (loaded == array).all()
+    assert loaded.flags.writeable and loaded.flags.owndata
+    fortran = reloaded.get_numeric_data("fortran.npy")
+    assert fortran.flags.f_contiguous and (fortran == array).all()
+    assert (reloaded.get_numeric_data("records.npy") == records).all()
+    reloaded.close()